@@ -1,29 +1,115 @@
-from fastapi import FastAPI, Depends, HTTPException
+import inspect
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, Security
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-
-from database import db
-from middleware import verify_token
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional, Union
+
+import metrics
+import profiling
+from database import (
+    DB_MODE,
+    dispose_async_engine,
+    dispose_engine,
+    get_async_db,
+    get_async_engine,
+    get_backend,
+    get_db,
+    get_engine,
+)
+from http_cache import (
+    encoded_etag,
+    is_not_modified,
+    negotiate_encoding,
+    not_modified,
+    validator_headers,
+)
+from middleware import (
+    CompressionMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    bearer,
+    optional_bearer,
+    revoke_all_tokens,
+    verify_token,
+)
+from replicas import get_async_read_db, get_read_db, replica_router
+from responses import FastJSONResponse
 
 # Import all schemas (Read and Write)
 from schemas import (
     ArticleResponse, 
+    ArticleSummary,
+    CategoryResponse,
     ContactForm, 
     NewsletterSub,
+    PopularArticle,
     LoginRequest,
+    RefreshRequest,
     ArticleCreate,
-    ArticleUpdate
+    ArticleImport,
+    ArticleUpdate,
+    SearchHit,
 )
 
 # Import all services
 from services import (
+    BULK_CHUNK_SIZE,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    MAX_SEARCH_OFFSET,
+    MAX_STREAM_ROWS,
     ArticleManager, 
+    AsyncArticleManager,
+    AsyncCategoryManager,
+    AsyncContactManager,
+    AsyncNewsletterManager,
+    CategoryManager,
     ContactManager, 
     NewsletterManager, 
-    UserManager
+    UserManager,
+    CONTACT_INSERT,
+    SUBSCRIBER_INSERT,
+    cached_categories,
+    cached_page,
+    cached_search,
+    find_category,
+    invalidate_categories,
+    invalidate_listings,
+    slug_index,
+    slugify,
 )
-
-app = FastAPI(title="VerdantVistas API")
+from snapshots import article_snapshots
+from view_counter import view_counter
+import writer
+
+# Startup only builds the (lazy) engine - no DDL, seeding or queries on the serving
+# path. Schema and seed data are handled by `python manage.py migrate|seed` at deploy time.
+# The replica health checks and the view counter start threads that make their first
+# queries off the event loop.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_engine()
+    if DB_MODE == "async":
+        get_async_engine()
+    replica_router.start()
+    view_counter.start()
+    if writer.ENABLED:
+        writer.start_writers({"contacts": CONTACT_INSERT, "subscribers": get_backend().insert_ignore(SUBSCRIBER_INSERT)})
+    yield
+    writer.stop_writers()  # Flushes whatever is still buffered
+    view_counter.stop()  # Writes the views counted since the last flush
+    await replica_router.stop_async()
+    dispose_engine()
+    await dispose_async_engine()
+
+
+app = FastAPI(title="VerdantVistas API", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -32,25 +118,102 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "ETag", "Last-Modified"],
 )
 
+# gzip/brotli for JSON responses above compression_min_size (see middleware.py)
+app.add_middleware(CompressionMiddleware)
+# Samples profile_sample_rate of requests into collapsed stacks (off by default)
+app.add_middleware(ProfilingMiddleware)
+# Outermost, so the latency histograms include compression, CORS and profiling overhead
+app.add_middleware(MetricsMiddleware)
+
 # --- DEPENDENCIES (The Factory Functions) ---
 
+# Each factory receives a request-scoped Session from get_db, so concurrent
+# requests use separate pooled connections.
+
 # 1. User Manager (This was missing!)
+# Login doesn't touch the DB once the admin id is known, so no session is checked out
 def get_user_manager():
-    return UserManager(db)
+    return UserManager()
+
+# 2-5. Article / Category / Contact / Newsletter Managers
+# db_mode=async swaps in the async managers (aiomysql, no threadpool); the routes
+# below await either kind through run(). The public read routes don't use these:
+# they answer from memory and only open a (possibly replica) session on a miss,
+# through with_article_manager / with_category_manager below.
+if DB_MODE == "async":
+    def get_article_manager(db: AsyncSession = Depends(get_async_db)):
+        return AsyncArticleManager(db)
+
+    def get_category_manager(db: AsyncSession = Depends(get_async_db)):
+        return AsyncCategoryManager(db)
+else:
+    def get_article_manager(db: Session = Depends(get_db)):
+        return ArticleManager(db)
+
+    def get_category_manager(db: Session = Depends(get_db)):
+        return CategoryManager(db)
+
+
+# write_behind=true: form submissions are only spooled, so they don't need a DB connection
+if writer.ENABLED:
+    def get_contact_manager():
+        return ContactManager(None)
 
-# 2. Article Manager
-def get_article_manager():
-    return ArticleManager(db)
+    def get_news_manager():
+        return NewsletterManager(None)
+elif DB_MODE == "async":
+    def get_contact_manager(db: AsyncSession = Depends(get_async_db)):
+        return AsyncContactManager(db)
 
-# 3. Contact Manager
-def get_contact_manager(): 
-    return ContactManager(db)
+    def get_news_manager(db: AsyncSession = Depends(get_async_db)):
+        return AsyncNewsletterManager(db)
+else:
+    def get_contact_manager(db: Session = Depends(get_db)): 
+        return ContactManager(db)
 
-# 4. Newsletter Manager
-def get_news_manager(): 
-    return NewsletterManager(db)
+    def get_news_manager(db: Session = Depends(get_db)): 
+        return NewsletterManager(db)
+
+
+async def run(method, *args):
+    if inspect.iscoroutinefunction(method):
+        return await method(*args)
+    return await run_in_threadpool(method, *args)
+
+
+# For read routes that usually answer from memory: the session (and its pooled
+# connection, possibly on a replica) is only opened when the manager is needed.
+async def with_read_manager(request, manager_class, async_manager_class, method, *args):
+    if DB_MODE == "async":
+        async with asynccontextmanager(get_async_read_db)(request) as db:
+            return await getattr(async_manager_class(db), method)(*args)
+
+    def call():
+        with contextmanager(get_read_db)(request) as db:
+            return getattr(manager_class(db), method)(*args)
+    return await run_in_threadpool(call)
+
+async def with_article_manager(request, method, *args):
+    return await with_read_manager(request, ArticleManager, AsyncArticleManager, method, *args)
+
+async def with_category_manager(request, method, *args):
+    return await with_read_manager(request, CategoryManager, AsyncCategoryManager, method, *args)
+
+
+# Same, on the primary, for writes split into units of work that each get their own
+# session (bulk import chunks), so nothing is held while waiting on the client
+async def with_primary_article_manager(method, *args):
+    if DB_MODE == "async":
+        async with asynccontextmanager(get_async_db)() as db:
+            return await getattr(AsyncArticleManager(db), method)(*args)
+
+    def call():
+        with contextmanager(get_db)() as db:
+            return getattr(ArticleManager(db), method)(*args)
+    return await run_in_threadpool(call)
 
 
 # --- ROUTES ---
@@ -59,6 +222,29 @@ def get_news_manager():
 def home():
     return {"message": "VerdantVistas API is running"}
 
+# --- OPERATIONS ---
+# Pool checkout wait times and in-use connection counts, for sizing the pool under load
+@app.get("/api/stats")
+def stats():
+    return metrics.snapshot()
+
+# Prometheus scrape target: route latency histograms, requests in flight, SQL latency
+# per manager method, pool/cache/writer gauges
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+# Collapsed stacks from sampled requests (profile_sample_rate), self time in microseconds:
+#   curl -H "Authorization: Bearer ..." .../api/profile > api.folded && flamegraph.pl api.folded > api.svg
+@app.get("/api/profile", include_in_schema=False)
+def profile_stacks(reset: bool = False, user: dict = Depends(verify_token)):
+    if user['userType'] != 'admin': 
+        raise HTTPException(status_code=403, detail="Admins Only")
+    stacks = profiling.render_collapsed()
+    if reset:
+        profiling.reset()
+    return PlainTextResponse(stacks)
+
 # --- AUTH ---
 @app.post("/api/auth/login")
 def login(
@@ -67,19 +253,258 @@ def login(
 ):
     return manager.login(data)
 
+@app.post("/api/auth/refresh")
+def refresh_token(
+    data: RefreshRequest,
+    manager: UserManager = Depends(get_user_manager)
+):
+    return manager.refresh(data.refresh_token)
+
+# Revokes the whole session: this access token and the refresh token issued with it
+@app.post("/api/auth/logout")
+def logout(
+    credentials: HTTPAuthorizationCredentials = Security(bearer),
+    user: dict = Depends(verify_token),
+    manager: UserManager = Depends(get_user_manager)
+):
+    return manager.logout(user, credentials.credentials)
+
+# For secret rotation / "log out everywhere": invalidates every token issued before now
+@app.post("/api/auth/revoke-all")
+def revoke_all(user: dict = Depends(verify_token)):
+    if user['userType'] != 'admin': 
+        raise HTTPException(status_code=403, detail="Admins Only")
+    revoke_all_tokens()
+    return {"message": "All tokens revoked"}
+
 # --- PUBLIC ARTICLES ---
-@app.get("/api/articles", response_model=List[ArticleResponse])
-def get_articles(manager: ArticleManager = Depends(get_article_manager)):
-    return manager.get_all_articles()
+# Public except for stream=true (see below)
+def verify_stream_token(
+    stream: bool = False,
+    credentials: Optional[HTTPAuthorizationCredentials] = Security(optional_bearer)
+):
+    if not stream:
+        return None
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="stream=true requires an admin token")
+    user = verify_token(credentials)
+    if user['userType'] != 'admin': 
+        raise HTTPException(status_code=403, detail="Admins Only")
+    return user
+
+# Paginated with an opaque keyset cursor: the cursor for the next page is sent back
+# in the X-Next-Cursor header (absent on the last page). view=summary (the default)
+# leaves out the article body; view=full includes it.
+# A listing's ETag is a hash of the page it is served with, kept in the same cache entry,
+# so a 304 from a cached page costs no query. Listings carry no Last-Modified:
+# MAX(updated_at) doesn't move when an article is deleted, so If-Modified-Since would
+# keep serving the deleted article. Streamed pages are never buffered, so they carry no ETag.
+# stream=true allows pages of up to max_stream_rows, sent as an incrementally encoded
+# JSON array straight from a server-side cursor (same cursor header, no buffering).
+# It needs an admin token: a stream holds a pooled connection for as long as the
+# client keeps reading, and its next cursor costs an OFFSET of limit rows.
+@app.get("/api/articles", response_model=List[Union[ArticleResponse, ArticleSummary]])
+async def get_articles(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_STREAM_ROWS),
+    cursor: Optional[str] = None,
+    view: Literal["summary", "full"] = "summary",
+    stream: bool = False,
+    user: Optional[dict] = Depends(verify_stream_token)
+):
+    return await listing_response(request, limit, cursor, view, stream)
+
+async def listing_response(request, limit, cursor, view, stream, category=None):
+    if not stream and limit > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit above {MAX_PAGE_SIZE} requires stream=true")
+    category_id = category["id"] if category else None
+
+    if stream:
+        body, next_cursor = await with_article_manager(request, "stream_articles", limit, cursor, view, category_id)
+        headers = {"Cache-Control": "private, no-store"}  # Authenticated, never shared
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return StreamingResponse(body, media_type="application/json", headers=headers)
+
+    page = cached_page(limit, cursor, view, category_id)
+    if page is None:
+        page = await with_article_manager(request, "fetch_page", limit, cursor, view, category_id)
+    articles, next_cursor, etag = page
+    headers = validator_headers(etag)
+    if is_not_modified(request, etag):
+        return not_modified(headers)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    # Rows are trusted DB output already shaped like the response model: encode them directly
+    return FastJSONResponse(articles, headers=headers)
+
+# --- POPULAR ---
+# Most viewed published articles, from the list view_counter.py keeps in memory (no DB
+# access). Declared before /api/articles/{id} so "popular" isn't parsed as an id.
+@app.get("/api/articles/popular", response_model=List[PopularArticle])
+async def get_popular_articles(limit: int = Query(view_counter.popular_size, ge=1, le=view_counter.popular_size)):
+    return FastJSONResponse(view_counter.popular[:limit])
+
+# --- BULK IMPORT / EXPORT (Protected) ---
+# Declared before /api/articles/{id} so "export" isn't parsed as an id.
+MAX_REPORTED_ERRORS = 1000
+
+# NDJSON stream of every post, read through a server-side cursor
+@app.get("/api/articles/export")
+def export_articles(user: dict = Depends(verify_token)):
+    if user['userType'] != 'admin': 
+        raise HTTPException(status_code=403, detail="Admins Only")
 
+    manager = AsyncArticleManager(None) if DB_MODE == "async" else ArticleManager(None)
+    return StreamingResponse(
+        manager.export_articles(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="articles.ndjson"'},
+    )
+
+async def ndjson_lines(request):
+    buffer = b""
+    line_no = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, line
+    if buffer.strip():
+        yield line_no + 1, buffer
+
+# One article per NDJSON line. The body is read incrementally and inserted in chunks of
+# bulk_chunk_size rows, each in its own transaction, so memory and lock time stay bounded
+# however large the archive is. Chunks already committed stay committed if a later one fails.
+# Each chunk checks out its own session: no pooled connection is held while a slow client
+# uploads the next one.
+@app.post("/api/articles/bulk")
+async def bulk_import_articles(
+    request: Request,
+    response: Response,
+    user: dict = Depends(verify_token)
+):
+    if user['userType'] != 'admin': 
+        raise HTTPException(status_code=403, detail="Admins Only")
+
+    inserted, failed, errors, chunk = 0, 0, [], []
+
+    async def flush():
+        nonlocal inserted, failed
+        try:
+            count, chunk_errors = await with_primary_article_manager("import_articles", chunk, user['id'])
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail={
+                "error": e.detail, "inserted": inserted, "failed_at_line": chunk[0][0]
+            })
+        inserted += count
+        failed += len(chunk_errors)
+        errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+        chunk.clear()
+
+    try:
+        async for line_no, line in ndjson_lines(request):
+            try:
+                chunk.append((line_no, ArticleImport.model_validate_json(line)))
+            except ValidationError as e:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_no, "error": e.errors(include_url=False, include_input=False)})
+                continue
+            if len(chunk) >= BULK_CHUNK_SIZE:
+                await flush()
+        if chunk:
+            await flush()
+    finally:
+        if inserted:
+            invalidate_listings()
+            invalidate_categories()
+            replica_router.note_write(response)
+
+    return {"inserted": inserted, "failed": failed, "errors": errors}
+
+# Single articles are served from pre-rendered snapshots (see snapshots.py): the stored
+# JSON, gzip or brotli bytes go out as-is and the DB is only queried on a snapshot miss.
 @app.get("/api/articles/{id}", response_model=ArticleResponse)
-def get_single_article(id: int, manager: ArticleManager = Depends(get_article_manager)):
-    return manager.get_article_by_id(id)
+async def get_single_article(id: int, request: Request):
+    return await article_response(id, request)
+
+# Slug permalinks resolve through the warm slug -> id map, then take the id path above
+@app.get("/api/articles/by-slug/{slug}", response_model=ArticleResponse)
+async def get_article_by_slug(slug: str, request: Request):
+    id = slug_index.get(slugify(slug))
+    if id is None:
+        id = await with_article_manager(request, "get_article_id_by_slug", slug)
+    return await article_response(id, request)
+
+async def article_response(id, request):
+    snapshot = article_snapshots.get(id)
+    if snapshot is None:
+        snapshot = await with_article_manager(request, "get_article_snapshot", id)
+    view_counter.record(id)  # In-memory only; flushed to posts.views in the background
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), snapshot.bodies)
+    headers = validator_headers(encoded_etag(snapshot.etag, encoding), snapshot.last_modified)
+    headers["Vary"] = "Accept-Encoding"
+    if is_not_modified(request, headers["ETag"], snapshot.last_modified):
+        return not_modified(headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(snapshot.bodies[encoding], media_type="application/json", headers=headers)
+
+# --- CATEGORIES ---
+# Served from the in-memory category list; counts are maintained by the article writes
+@app.get("/api/categories", response_model=List[CategoryResponse])
+async def get_categories(request: Request):
+    return FastJSONResponse(await read_categories(request))
+
+async def read_categories(request):
+    categories = cached_categories()
+    if categories is None:
+        categories = await with_category_manager(request, "fetch_categories")
+    return categories
+
+# Same keyset cursor, views and conditional requests as /api/articles, for one category
+@app.get("/api/categories/{slug}/articles", response_model=List[Union[ArticleResponse, ArticleSummary]])
+async def get_category_articles(
+    slug: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_STREAM_ROWS),
+    cursor: Optional[str] = None,
+    view: Literal["summary", "full"] = "summary",
+    stream: bool = False,
+    user: Optional[dict] = Depends(verify_stream_token)
+):
+    category = find_category(await read_categories(request), slug)
+    return await listing_response(request, limit, cursor, view, stream, category)
+
+# --- SEARCH ---
+# Relevance-ranked full-text search; the offset of the next page is sent in X-Next-Offset
+@app.get("/api/search", response_model=List[SearchHit])
+async def search_articles(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=200),
+    category: Optional[str] = Query(None, description="Category slug, e.g. poems"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET)
+):
+    results = cached_search(q, category, limit, offset)
+    if results is None:
+        results = await with_article_manager(request, "fetch_search", q, category, limit, offset)
+    hits, next_offset = results
+    headers = {}
+    if next_offset is not None and next_offset <= MAX_SEARCH_OFFSET:
+        headers["X-Next-Offset"] = str(next_offset)
+    return FastJSONResponse(hits, headers=headers)
 
 # --- ADMIN ARTICLE MANAGEMENT (Protected) ---
 @app.post("/api/articles")
-def create_article(
+async def create_article(
     data: ArticleCreate, 
+    response: Response,
     user: dict = Depends(verify_token), # Ensures user is logged in
     manager: ArticleManager = Depends(get_article_manager)
 ):
@@ -87,46 +512,54 @@ def create_article(
     if user['userType'] != 'admin': 
         raise HTTPException(status_code=403, detail="Admins Only")
         
-    return manager.create_article(data, user['id'])
+    result = await run(manager.create_article, data, user['id'])
+    replica_router.note_write(response)
+    return result
 
 @app.put("/api/articles/{id}")
-def update_article(
+async def update_article(
     id: int, 
     data: ArticleUpdate, 
+    response: Response,
     user: dict = Depends(verify_token), 
     manager: ArticleManager = Depends(get_article_manager)
 ):
     if user['userType'] != 'admin': 
         raise HTTPException(status_code=403, detail="Admins Only")
         
-    return manager.update_article(id, data)
+    result = await run(manager.update_article, id, data)
+    replica_router.note_write(response)
+    return result
 
 @app.delete("/api/articles/{id}")
-def delete_article(
+async def delete_article(
     id: int, 
+    response: Response,
     user: dict = Depends(verify_token), 
     manager: ArticleManager = Depends(get_article_manager)
 ):
     if user['userType'] != 'admin': 
         raise HTTPException(status_code=403, detail="Admins Only")
         
-    return manager.delete_article(id)
+    result = await run(manager.delete_article, id)
+    replica_router.note_write(response)
+    return result
 
 # --- CONTACT FORM ---
 @app.post("/api/contact")
-def send_message(
+async def send_message(
     form_data: ContactForm, 
     manager: ContactManager = Depends(get_contact_manager)
 ):
-    return manager.submit_message(form_data)
+    return await run(manager.submit_message, form_data)
 
 # --- NEWSLETTER ---
 @app.post("/api/subscribe")
-def subscribe_newsletter(
+async def subscribe_newsletter(
     sub_data: NewsletterSub, 
     manager: NewsletterManager = Depends(get_news_manager)
 ):
-    return manager.subscribe(sub_data.email)
+    return await run(manager.subscribe, sub_data.email)
 # from fastapi import FastAPI, Depends, HTTPException
 # from fastapi.middleware.cors import CORSMiddleware
 # from database import db
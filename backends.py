@@ -0,0 +1,177 @@
+# backend/backends.py
+# Storage backends. Everything that differs between MySQL and the embedded SQLite
+# engine lives here: connection setup (primary and read replicas), the handful of
+# non-portable SQL fragments the managers need (row locks, INSERT IGNORE, full-text
+# search), replication lag and query-plan checks.
+# The managers build their SQL from these pieces and stay dialect-free.
+#
+#   db_backend=mysql   (default) pymysql/aiomysql over TLS, from dbuser/dbpassword/...
+#   db_backend=sqlite  sqlite_path=/var/lib/blog/blog.db (required)
+#                      WAL journal, memory-mapped reads (sqlite_mmap_size), FTS5 search.
+#                      sqlite_read_only=1 opens the file read-only, for edge replicas
+#                      that are shipped a copy of the database.
+import os
+import re
+import sqlite3
+import ssl
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Query aliases the plan checks look at (listings read article_summaries s, search posts p)
+TABLES = {"p": "posts", "s": "article_summaries"}
+
+
+class MySQLBackend:
+    name = "mysql"
+    for_update = " FOR UPDATE"
+    explain_prefix = "EXPLAIN "
+
+    def __init__(self, host=None, port=None):
+        host, port = host or os.getenv('dbhost'), port or os.getenv('dbport')
+        self.url = f"mysql+pymysql://{os.getenv('dbuser')}:{os.getenv('dbpassword')}@{host}:{port}/{os.getenv('dbname')}"
+        self.ssl_cert_path = os.path.join(BASE_DIR, "isrgrootx1.pem")
+
+    # A db_replicas entry: "host" or "host:port", same credentials and schema name
+    def replica(self, entry):
+        host, _, port = entry.partition(":")
+        return MySQLBackend(host, port or os.getenv('dbport'))
+
+    # Seconds behind the source, or None when the server isn't a replica (or we may not ask)
+    def replica_lag(self, conn):
+        try:
+            row = conn.execute(text("SHOW REPLICA STATUS")).mappings().fetchone()
+        except Exception:
+            return None
+        return row["Seconds_Behind_Source"] if row else None
+
+    def create_engine(self, pool_options):
+        return create_engine(self.url, connect_args={"ssl": {"ca": self.ssl_cert_path}}, **pool_options)
+
+    def create_async_engine(self, pool_options):
+        return create_async_engine(
+            self.url.replace("mysql+pymysql://", "mysql+aiomysql://", 1),
+            connect_args={"ssl": ssl.create_default_context(cafile=self.ssl_cert_path)},
+            **pool_options)
+
+    def insert_ignore(self, statement):
+        return statement.replace("INSERT INTO", "INSERT IGNORE INTO", 1)
+
+    # (extra FROM clause, WHERE condition, relevance expression) over posts p
+    def search_sql(self):
+        match = "MATCH(p.title, p.excerpt, p.content) AGAINST (:q IN NATURAL LANGUAGE MODE)"
+        return "", match, match
+
+    def search_terms(self, q):
+        return q
+
+    def plan_problems(self, conn, label, query, params):
+        problems = []
+        for row in conn.execute(text(self.explain_prefix + query.text), params).mappings():
+            print(f"[{label}] table={row['table']} type={row['type']} key={row['key']} extra={row['Extra']}")
+            table = TABLES.get(row["table"])
+            if table is None:
+                continue
+            if row["type"] == "ALL":
+                problems.append(f"{label}: full table scan on {table}")
+            if "filesort" in (row["Extra"] or ""):
+                problems.append(f"{label}: filesort on {table}")
+        return problems
+
+
+class SQLiteBackend:
+    name = "sqlite"
+    for_update = ""  # SQLite locks the whole database for writers; there are no row locks
+    explain_prefix = "EXPLAIN QUERY PLAN "
+
+    def __init__(self, path=None, read_only=None, mmap_size=None):
+        # ":memory:" only when passed in directly (scripts): it is a single connection
+        # shared by every request's session, and `manage.py migrate` can't reach it
+        if path is None:
+            path = os.getenv("sqlite_path")
+            if not path or path == ":memory:":
+                raise ValueError("db_backend=sqlite needs sqlite_path set to a database file")
+        self.path = path
+        self.read_only = read_only if read_only is not None else os.getenv("sqlite_read_only", "0") == "1"
+        self.mmap_size = mmap_size if mmap_size is not None else int(os.getenv("sqlite_mmap_size", 256 * 1024 * 1024))
+
+    # A db_replicas entry: the path of a copy of the database, opened read-only
+    def replica(self, entry):
+        return SQLiteBackend(entry, read_only=True, mmap_size=self.mmap_size)
+
+    def replica_lag(self, conn):
+        return None  # No built-in replication; copies are compared by their newest row
+
+    def _url(self, driver):
+        if self.path == ":memory:":
+            return f"sqlite+{driver}://"
+        if self.read_only:
+            return f"sqlite+{driver}:///file:{self.path}?mode=ro&uri=true"
+        return f"sqlite+{driver}:///{self.path}"
+
+    def _options(self, pool_options):
+        # TIMESTAMP columns come back as datetime, like pymysql's
+        connect_args = {"check_same_thread": False, "detect_types": sqlite3.PARSE_DECLTYPES}
+        if self.path == ":memory:":
+            # One connection shared by every thread; each new one would be an empty database
+            return {"connect_args": connect_args, "poolclass": StaticPool}
+        return {"connect_args": connect_args, **pool_options}
+
+    def _on_connect(self, dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        if self.path != ":memory:" and not self.read_only:
+            cursor.execute("PRAGMA journal_mode=WAL")  # Readers never block on the writer
+            cursor.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; fsync per checkpoint, not per commit
+        cursor.execute(f"PRAGMA mmap_size={self.mmap_size}")  # Reads served straight from the page cache
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    def create_engine(self, pool_options):
+        engine = create_engine(self._url("pysqlite"), **self._options(pool_options))
+        event.listen(engine, "connect", self._on_connect)
+        return engine
+
+    def create_async_engine(self, pool_options):
+        engine = create_async_engine(self._url("aiosqlite"), **self._options(pool_options))
+        event.listen(engine.sync_engine, "connect", self._on_connect)
+        return engine
+
+    def insert_ignore(self, statement):
+        return statement.replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+
+    # posts_fts is an external-content FTS5 index over posts (migration 5); bm25() is
+    # lower for better matches
+    def search_sql(self):
+        return "JOIN posts_fts ON posts_fts.rowid = p.id", "posts_fts MATCH :q", "-bm25(posts_fts)"
+
+    # Natural-language input: any of the words, each quoted so FTS5 operators and
+    # punctuation in the query are taken literally
+    def search_terms(self, q):
+        terms = ['"' + term.replace('"', '""') + '"' for term in q.split()]
+        return " OR ".join(terms) or '""'
+
+    def plan_problems(self, conn, label, query, params):
+        problems = []
+        for row in conn.execute(text(self.explain_prefix + query.text), params).mappings():
+            print(f"[{label}] {row['detail']}")
+            # "SCAN s USING INDEX ..." walks the index in ORDER BY order and stops at the LIMIT
+            scan = re.match(r"SCAN (\w+)", row["detail"])
+            if scan and scan.group(1) in TABLES and "INDEX" not in row["detail"]:
+                problems.append(f"{label}: full table scan on {TABLES[scan.group(1)]}")
+            if "TEMP B-TREE" in row["detail"]:
+                problems.append(f"{label}: sort in a temporary b-tree")
+        return problems
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+
+
+def from_env():
+    name = os.getenv("db_backend", "mysql")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown db_backend {name!r}, expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,79 @@
+# backend/benchmarks/compression.py
+# Bytes on the wire vs CPU per encoding and level, for the payloads we actually serve:
+# the real blog_content.txt as one article, and listing pages built from synthetic
+# posts of the same size. No database needed.
+#   python -m benchmarks.compression --repeat 20
+import argparse
+import datetime
+import json
+import random
+import time
+
+from benchmarks.data import SAMPLE, synthetic_post
+from http_cache import AVAILABLE_ENCODINGS, compress
+from responses import dumps
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 6, 11)}
+
+
+def payloads():
+    rng = random.Random(3)
+    now = datetime.datetime(2026, 1, 1)
+
+    def row(number, full):
+        post = synthetic_post(rng, number)
+        row = {"id": number, "title": post["title"], "excerpt": post["excerpt"], "image": post["img"],
+               "date": now, "author": "Bench Author", "category": "Articles"}
+        if full:
+            row["content"] = post["content"]
+        return row
+
+    article = {"id": 1, "title": "blog_content.txt", "excerpt": SAMPLE[:200], "image": None,
+               "date": now, "author": "Bench Author", "category": "Articles", "content": SAMPLE}
+    return {
+        "article": dumps(article),
+        "page_summary_20": dumps([row(n, False) for n in range(20)]),
+        "page_full_20": dumps([row(n, True) for n in range(20)]),
+        "page_full_100": dumps([row(n, True) for n in range(100)]),
+    }
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return round(samples[len(samples) // 2], 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = {"benchmark": "compression", "encodings": list(AVAILABLE_ENCODINGS), "payloads": {}}
+    for name, body in payloads().items():
+        cases = []
+        for encoding in AVAILABLE_ENCODINGS:
+            for level in LEVELS[encoding]:
+                compressed = compress(body, encoding, level)
+                cases.append({
+                    "encoding": encoding,
+                    "level": level,
+                    "bytes": len(compressed),
+                    "ratio": round(len(body) / len(compressed), 2),
+                    "compress_ms": median_ms(lambda: compress(body, encoding, level), args.repeat),
+                })
+        results["payloads"][name] = {"identity_bytes": len(body), "cases": cases}
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
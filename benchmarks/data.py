@@ -0,0 +1,88 @@
+# backend/benchmarks/data.py
+# Synthetic posts for benchmarks, sized and worded like blog_content.txt.
+# Every generated post has a slug starting with "bench-" so it can be removed again.
+import os
+import random
+import re
+
+from sqlalchemy import text
+
+from benchmarks.startup import ROOT
+from migrations import REBUILD_SUMMARIES, RECOUNT_CATEGORIES
+
+BENCH_PREFIX = "bench-"
+BENCH_EMAIL = "bench@example.com"
+
+with open(os.path.join(ROOT, "blog_content.txt"), encoding="utf-8") as f:
+    SAMPLE = f.read()
+
+VOCABULARY = sorted({word.lower() for word in re.findall(r"[A-Za-z]{3,}", SAMPLE)})
+CONTENT_WORDS = max(1, len(SAMPLE.split()))
+
+
+def words(rng, count):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(count))
+
+
+def synthetic_post(rng, number):
+    return {
+        "title": words(rng, rng.randint(4, 8)).title(),
+        "slug": f"{BENCH_PREFIX}{number}",
+        "excerpt": words(rng, 25),
+        "content": words(rng, CONTENT_WORDS),
+        "img": f"https://example.com/covers/{number}.jpg",
+    }
+
+
+def ensure_bench_user(conn):
+    user_id = conn.execute(text("SELECT id FROM users WHERE email = :email"), {"email": BENCH_EMAIL}).scalar()
+    if user_id is None:
+        user_id = conn.execute(text("""
+            INSERT INTO users (username, email, password_hash, full_name, userType)
+            VALUES ('bench', :email, 'none', 'Bench Author', 'user')
+        """), {"email": BENCH_EMAIL}).lastrowid
+    return user_id
+
+
+def count_bench_posts(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM posts WHERE slug LIKE :prefix"), {"prefix": BENCH_PREFIX + "%"}).scalar()
+
+
+# Top up the bench posts to `total`, inserting in chunks of `chunk` rows per transaction
+def seed_posts(engine, total, chunk=1000, seed=42):
+    existing = count_bench_posts(engine)
+    with engine.begin() as conn:
+        user_id = ensure_bench_user(conn)
+        categories = conn.execute(text("SELECT id FROM categories")).scalars().all() or [None]
+
+    query = text("""
+        INSERT INTO posts (title, slug, excerpt, content, category_id, cover_image_url, is_published, user_id)
+        VALUES (:title, :slug, :excerpt, :content, :cat_id, :img, TRUE, :uid)
+    """)
+    rng = random.Random(seed + existing)
+    for start in range(existing, total, chunk):
+        rows = []
+        for number in range(start, min(start + chunk, total)):
+            post = synthetic_post(rng, number)
+            post.update(cat_id=rng.choice(categories), uid=user_id)
+            rows.append(post)
+        with engine.begin() as conn:
+            conn.execute(query, rows)
+        print(f"Seeded {start + len(rows)}/{total} bench posts")
+    # These inserts bypass ArticleManager's count and summary upkeep
+    rebuild_derived(engine)
+
+
+def clear_bench_posts(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM posts WHERE slug LIKE :prefix"), {"prefix": BENCH_PREFIX + "%"})
+        conn.execute(text("DELETE FROM users WHERE email = :email"), {"email": BENCH_EMAIL})
+    rebuild_derived(engine)
+
+
+def rebuild_derived(engine):
+    with engine.begin() as conn:
+        conn.execute(text(RECOUNT_CATEGORIES))
+        for statement in REBUILD_SUMMARIES:
+            conn.execute(text(statement))
@@ -0,0 +1,211 @@
+# backend/benchmarks/endpoints.py
+# Per-endpoint throughput, latency percentiles and peak RSS for the real app, driven
+# in-process through httpx's ASGI transport (no sockets, no uvicorn) by a pool of
+# concurrent clients. Seeds N "bench-" posts sized like blog_content.txt into a SQLite
+# stand-in (default) or the configured MySQL database, then runs each endpoint in a
+# fresh process so its peak RSS is its own.
+#   python -m benchmarks.endpoints --posts 2000 --requests 2000 --concurrency 32 --output head.json
+#   python -m benchmarks.endpoints --backend mysql --db-mode async --baseline head.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import text
+
+from benchmarks.data import BENCH_PREFIX, VOCABULARY, clear_bench_posts, seed_posts
+from benchmarks.load import percentile
+from benchmarks.memory import peak_rss_mb
+from benchmarks.startup import ROOT
+
+# name -> path template; {id}, {slug}, {category} and {q} are filled from the seeded data
+ENDPOINTS = {
+    "home": "/",
+    "list_summary": "/api/articles",
+    "list_full": "/api/articles?view=full&limit=10",
+    "list_stream_1000": "/api/articles?view=full&limit=1000&stream=true",
+    "article": "/api/articles/{id}",
+    "article_by_slug": "/api/articles/by-slug/{slug}",
+    "categories": "/api/categories",
+    "category_feed": "/api/categories/{category}/articles",
+    "search": "/api/search?q={q}",
+    "popular": "/api/articles/popular",
+}
+# Sent with an admin bearer token (stream=true is admin only)
+ADMIN_ENDPOINTS = {"list_stream_1000"}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def connect(backend, sqlite_path):
+    if backend == "sqlite":
+        from benchmarks.standin import use_sqlite
+        return use_sqlite(sqlite_path)
+    from database import get_engine
+    return get_engine()
+
+
+def sample_paths(engine, template, count, rng):
+    with engine.connect() as conn:
+        posts = conn.execute(text("SELECT id, slug FROM posts WHERE slug LIKE :prefix AND is_published = TRUE"),
+                             {"prefix": BENCH_PREFIX + "%"}).all()
+        categories = conn.execute(text("SELECT slug FROM categories")).scalars().all()
+    paths = []
+    for _ in range(count):
+        post = rng.choice(posts)
+        paths.append(template.format(
+            id=post.id, slug=post.slug, category=rng.choice(categories),
+            q="+".join(rng.sample(VOCABULARY, 2)),
+        ))
+    return paths
+
+
+def admin_headers():
+    from services import UserManager
+    return {"Authorization": f"Bearer {UserManager()._issue_tokens(None)['token']}"}
+
+
+async def drive(paths, concurrency, warmup, headers=None):
+    from app import app
+
+    latencies = []
+    errors = 0
+    queue = iter(paths)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            for path in paths[:warmup]:  # Fill the caches, as on a server that has been up a while
+                await client.get(path)
+
+            async def worker():
+                nonlocal errors
+                for path in queue:
+                    started = time.perf_counter()
+                    res = await client.get(path)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    if res.status_code >= 400:
+                        errors += 1
+                    else:
+                        latencies.append(elapsed)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) or 0, 2),
+        "p95_ms": round(percentile(latencies, 95) or 0, 2),
+        "p99_ms": round(percentile(latencies, 99) or 0, 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else None,
+    }
+
+
+# Runs in the child process
+def measure(name, args):
+    engine = connect(args.backend, args.sqlite_path)
+    paths = sample_paths(engine, ENDPOINTS[name], args.requests, random.Random(name))
+    baseline = peak_rss_mb()
+    headers = admin_headers() if name in ADMIN_ENDPOINTS else None
+    result = asyncio.run(drive(paths, args.concurrency, args.warmup, headers))
+    result.update(path=ENDPOINTS[name], baseline_rss_mb=round(baseline, 1), peak_rss_mb=round(peak_rss_mb(), 1))
+    return result
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    for name, result in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before or not before.get("rps") or not before.get("p99_ms"):
+            continue
+        result["vs_baseline"] = {
+            "commit": baseline.get("commit"),
+            "rps_change_pct": round((result["rps"] / before["rps"] - 1) * 100, 1),
+            "p99_change_pct": round((result["p99_ms"] / before["p99_ms"] - 1) * 100, 1),
+            "peak_rss_change_mb": round(result["peak_rss_mb"] - before["peak_rss_mb"], 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--sqlite-path", help="Stand-in database file (default: a temporary file)")
+    parser.add_argument("--db-mode", choices=("sync", "async"), default=os.getenv("db_mode", "sync"))
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=1000, help="Per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="Leave the bench posts in place afterwards")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    parser.add_argument("--output")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args)))
+        return
+
+    os.environ["db_mode"] = args.db_mode  # Read by database.py in the children
+    temporary = args.backend == "sqlite" and not args.sqlite_path
+    if temporary:
+        args.sqlite_path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "standin.db")
+
+    names = args.endpoints.split(",")
+    results = {
+        "benchmark": "endpoints",
+        "commit": git_commit(),
+        "backend": args.backend,
+        "db_mode": args.db_mode,
+        "posts": args.posts,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "endpoints": {},
+    }
+    engine = connect(args.backend, args.sqlite_path)
+    try:
+        seed_posts(engine, args.posts)
+        for name in names:
+            command = [sys.executable, "-m", "benchmarks.endpoints", "--child", name,
+                       "--backend", args.backend, "--db-mode", args.db_mode,
+                       "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+                       "--warmup", str(args.warmup)]
+            if args.sqlite_path:
+                command += ["--sqlite-path", args.sqlite_path]
+            output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+            results["endpoints"][name] = json.loads(output.strip().splitlines()[-1])
+            print(f"{name}: {results['endpoints'][name]['rps']} req/s", file=sys.stderr)
+    finally:
+        if temporary:
+            engine.dispose()
+            shutil.rmtree(os.path.dirname(args.sqlite_path), ignore_errors=True)
+        elif not args.keep:
+            clear_bench_posts(engine)
+
+    if args.baseline:
+        compare(results, args.baseline)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
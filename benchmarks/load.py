@@ -0,0 +1,123 @@
+# backend/benchmarks/load.py
+# Load benchmark for db_mode=sync vs db_mode=async. For each mode a fresh uvicorn
+# server is started against the configured database, then each concurrency level
+# is driven for a fixed duration and requests/sec and latency percentiles are reported.
+#   python -m benchmarks.load --modes sync,async --concurrency 50,200,1000 --duration 20
+#   python -m benchmarks.load --url http://127.0.0.1:8000 --label prod-like   (existing server)
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import httpx
+
+from benchmarks.startup import ROOT, free_port
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def drive(url, paths, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def worker(offset):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                path = paths[i % len(paths)]
+                i += 1
+                started = time.perf_counter()
+                try:
+                    res = await client.get(path)
+                    if res.status_code >= 500:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) or 0, 2),
+        "p99_ms": round(percentile(latencies, 99) or 0, 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else None,
+    }
+
+
+def start_server(mode, workers):
+    port = free_port()
+    env = dict(os.environ, db_mode=mode)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            urllib.request.urlopen(url + "/", timeout=1).read()
+            return proc, url
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{mode} server exited with code {proc.returncode}")
+            time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--url", help="Benchmark an already running server instead of spawning one per mode")
+    parser.add_argument("--label", default="external")
+    parser.add_argument("--concurrency", default="50,200,1000")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per concurrency level")
+    parser.add_argument("--paths", default="/api/articles,/api/articles?view=full&limit=10")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    paths = args.paths.split(",")
+    results = {"benchmark": "load", "paths": paths, "duration_s": args.duration, "modes": {}}
+
+    targets = [(args.label, None)] if args.url else [(mode, mode) for mode in args.modes.split(",")]
+    for label, mode in targets:
+        proc, url = (None, args.url) if args.url else start_server(mode, args.workers)
+        try:
+            results["modes"][label] = [asyncio.run(drive(url, paths, level, args.duration)) for level in levels]
+        finally:
+            if proc:
+                proc.terminate()
+                proc.wait()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
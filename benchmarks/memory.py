@@ -0,0 +1,84 @@
+# backend/benchmarks/memory.py
+# Peak RSS per request vs row count, buffered (get_all_articles + one JSON encode)
+# vs streamed (stream_articles, server-side cursor), against the configured (migrated)
+# database. Seeds "bench-" posts up to the largest size, runs every (mode, rows) case
+# in a fresh process so ru_maxrss isn't polluted by the previous one, then removes them.
+#   python -m benchmarks.memory --rows 1000,10000,50000
+import argparse
+import json
+import resource
+import subprocess
+import sys
+
+from benchmarks.data import clear_bench_posts, seed_posts
+from benchmarks.startup import ROOT
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+# Runs in the child process
+def measure(mode, rows):
+    from database import SessionLocal, get_engine
+    from responses import dumps
+    from services import ArticleManager
+
+    get_engine()
+    db = SessionLocal()
+    baseline = peak_rss_mb()
+    sent = 0
+    try:
+        manager = ArticleManager(db)
+        if mode == "buffered":
+            articles, _, _ = manager.get_all_articles(rows, None, "full")
+            sent = len(dumps(articles))
+        else:
+            body, _ = manager.stream_articles(rows, None, "full")
+            for chunk in body:
+                sent += len(chunk)
+    finally:
+        db.close()
+    return {"mode": mode, "rows": rows, "bytes": sent,
+            "baseline_mb": round(baseline, 1), "peak_mb": round(peak_rss_mb(), 1),
+            "delta_mb": round(peak_rss_mb() - baseline, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="1000,10000,50000")
+    parser.add_argument("--keep", action="store_true", help="Leave the bench posts in place afterwards")
+    parser.add_argument("--output")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "ROWS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], int(args.child[1]))))
+        return
+
+    from database import get_engine
+
+    sizes = [int(n) for n in args.rows.split(",")]
+    engine = get_engine()
+    results = {"benchmark": "memory", "cases": []}
+    try:
+        seed_posts(engine, max(sizes))
+        for rows in sizes:
+            for mode in ("buffered", "streamed"):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.memory", "--child", mode, str(rows)],
+                    cwd=ROOT, capture_output=True, text=True, check=True,
+                ).stdout
+                results["cases"].append(json.loads(output.strip().splitlines()[-1]))
+    finally:
+        if not args.keep:
+            clear_bench_posts(engine)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
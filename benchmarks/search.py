@@ -0,0 +1,65 @@
+# backend/benchmarks/search.py
+# Search latency at growing archive sizes, against the configured (migrated) database.
+# Seeds "bench-" posts up to each size, times ArticleManager.search_articles with the
+# article cache cleared so every query reaches the FULLTEXT index, then removes them.
+#   python -m benchmarks.search --sizes 10000,100000 --queries 200
+import argparse
+import json
+import random
+import time
+
+from benchmarks.data import VOCABULARY, clear_bench_posts, seed_posts
+from benchmarks.load import percentile
+from database import SessionLocal, get_engine
+from services import ArticleManager, article_cache
+
+
+def time_queries(count, category, rng):
+    samples = []
+    db = SessionLocal()
+    try:
+        manager = ArticleManager(db)
+        for _ in range(count):
+            q = " ".join(rng.sample(VOCABULARY, rng.randint(1, 2)))
+            article_cache.clear()
+            started = time.perf_counter()
+            manager.search_articles(q, category)
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        db.close()
+    return {
+        "queries": count,
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--category", help="Also filter by this category slug")
+    parser.add_argument("--keep", action="store_true", help="Leave the bench posts in place afterwards")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    rng = random.Random(7)
+    results = {"benchmark": "search", "category": args.category, "sizes": {}}
+    try:
+        for size in (int(size) for size in args.sizes.split(",")):
+            seed_posts(engine, size)
+            results["sizes"][size] = time_queries(args.queries, args.category, rng)
+    finally:
+        if not args.keep:
+            clear_bench_posts(engine)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# backend/benchmarks/serialization.py
+# Micro-benchmark for article list serialization, no database needed:
+#   pydantic: DB column names -> validate each row through the response model
+#             (aliases) -> dump JSON, which is what FastAPI did for response_model
+#   fast:     SQL-aliased wire names -> responses.dumps (orjson when installed)
+#   python -m benchmarks.serialization --rows 100,1000,10000
+import argparse
+import datetime
+import json
+import random
+import statistics
+import time
+from typing import List, Union
+
+from pydantic import TypeAdapter
+
+from benchmarks.data import synthetic_post
+from responses import dumps, orjson
+from schemas import ArticleResponse, ArticleSummary
+
+adapter = TypeAdapter(List[Union[ArticleResponse, ArticleSummary]])
+
+
+def make_rows(count, view):
+    rng = random.Random(1)
+    now = datetime.datetime(2026, 1, 1)
+    db_rows, wire_rows = [], []
+    for number in range(count):
+        post = synthetic_post(rng, number)
+        created = now - datetime.timedelta(minutes=number)
+        db_row = {"id": number, "title": post["title"], "excerpt": post["excerpt"], "cover_image_url": post["img"],
+                  "created_at": created, "author_name": "Bench Author", "category_name": "Articles"}
+        wire_row = {"id": number, "title": post["title"], "excerpt": post["excerpt"], "image": post["img"],
+                    "date": created, "author": "Bench Author", "category": "Articles"}
+        if view == "full":
+            db_row["content"] = wire_row["content"] = post["content"]
+        db_rows.append(db_row)
+        wire_rows.append(wire_row)
+    return db_rows, wire_rows
+
+
+def best_of(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(min(samples), 3), round(statistics.median(samples), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = {"benchmark": "serialization", "encoder": "orjson" if orjson else "json", "cases": []}
+    for view in ("summary", "full"):
+        for count in (int(n) for n in args.rows.split(",")):
+            db_rows, wire_rows = make_rows(count, view)
+            slow_body = adapter.dump_json(adapter.validate_python(db_rows))
+            fast_body = dumps(wire_rows)
+            assert json.loads(slow_body) == json.loads(fast_body), "paths disagree"
+
+            slow_min, slow_median = best_of(lambda: adapter.dump_json(adapter.validate_python(db_rows)), args.repeat)
+            fast_min, fast_median = best_of(lambda: dumps(wire_rows), args.repeat)
+            results["cases"].append({
+                "view": view,
+                "rows": count,
+                "bytes": len(fast_body),
+                "pydantic_ms": {"min": slow_min, "median": slow_median},
+                "fast_ms": {"min": fast_min, "median": fast_median},
+                "speedup": round(slow_median / fast_median, 1) if fast_median else None,
+            })
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+# backend/benchmarks/standin.py
+# A SQLite file standing in for MySQL behind the unchanged managers, so the benchmarks
+# run on a laptop or CI box with no database server: the embedded backend from
+# backends.py, migrated and seeded like a fresh deploy.
+import database
+from backends import SQLiteBackend
+from migrations import migrate
+from seed import seed_database
+
+
+def use_sqlite(path):
+    database.use_backend(SQLiteBackend(path))
+    migrate()
+    seed_database()
+    return database.get_engine()
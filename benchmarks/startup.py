@@ -0,0 +1,78 @@
+# backend/benchmarks/startup.py
+# Cold-start benchmark: time from spawning a fresh uvicorn process (import app,
+# run lifespan) until the first request is served.
+#   python -m benchmarks.startup --runs 5 --budget-ms 1500 --output startup.json
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_once(path, timeout):
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as res:
+                    res.read()
+                    return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError(f"no response within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/", help="First request to serve, e.g. /api/articles to include the first DB round-trip")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--budget-ms", type=float, help="Exit non-zero if the median exceeds this")
+    parser.add_argument("--output", help="Write the JSON result here as well as to stdout")
+    args = parser.parse_args()
+
+    samples = [measure_once(args.path, args.timeout) for _ in range(args.runs)]
+    result = {
+        "benchmark": "startup",
+        "path": args.path,
+        "runs": args.runs,
+        "min_ms": round(min(samples), 1),
+        "median_ms": round(statistics.median(samples), 1),
+        "max_ms": round(max(samples), 1),
+        "samples_ms": [round(s, 1) for s in samples],
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.budget_ms and result["median_ms"] > args.budget_ms:
+        print(f"❌ median startup {result['median_ms']}ms exceeds budget {args.budget_ms}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
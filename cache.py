@@ -0,0 +1,70 @@
+# backend/cache.py
+# Bounded in-process cache with a per-entry TTL and LRU eviction.
+# Each worker process has its own copy, so the TTL is also the upper bound on how
+# stale another worker's entry can be after a write.
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, name, maxsize=1024, ttl=60.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        metrics.register_gauge(f"cache.{name}", self.stats)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= time.monotonic():
+                if entry is not _MISSING:
+                    del self._data[key]  # Expired
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)  # Least recently used
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    # Drop every entry for which predicate(key, value) is true
+    def delete_where(self, predicate):
+        with self._lock:
+            doomed = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+            for key in doomed:
+                del self._data[key]
+        return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -1,100 +1,170 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
+import threading
+import time
+
+import backends
+import metrics
+import profiling
 
 load_dotenv()
 
-# Database Connection
-db_url = f"mysql+pymysql://{os.getenv('dbuser')}:{os.getenv('dbpassword')}@{os.getenv('dbhost')}:{os.getenv('dbport')}/{os.getenv('dbname')}"
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ssl_cert_path = os.path.join(BASE_DIR, "isrgrootx1.pem")
-engine = create_engine(db_url,
-                        connect_args={
-        "ssl": {
-            "ca": ssl_cert_path
-        }
-        
-        
-    },
-        pool_pre_ping=True,   # <--- Checks connection before using it
-        pool_recycle=1800,    # <--- Refreshes connection every 30 mins
-        pool_size=10,
-        max_overflow=20)
-
-session = sessionmaker(bind=engine)
-db = session()
-
-# 1. Create Database
-db.execute(text("CREATE DATABASE IF NOT EXISTS blogify_db"))
-print("Database checked/created")
-
-# --- TABLE CREATION ---
-
-# 2. Users (Authors)
-db.execute(text("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        username VARCHAR(50) NOT NULL UNIQUE,
-        email VARCHAR(100) NOT NULL UNIQUE,
-        password_hash VARCHAR(255) NOT NULL,
-        full_name VARCHAR(100),
-        userType ENUM('user', 'admin') DEFAULT 'user',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-"""))
-
-# 3. Categories
-db.execute(text("""
-    CREATE TABLE IF NOT EXISTS categories (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        name VARCHAR(50) NOT NULL,
-        slug VARCHAR(50) NOT NULL UNIQUE
-    );
-"""))
-
-# 4. Posts (Articles) - Matching your Frontend Fields
-# Note: 'image' in frontend will map to 'cover_image_url' here
-db.execute(text("""
-    CREATE TABLE IF NOT EXISTS posts (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        user_id INT NOT NULL,
-        category_id INT NULL,
-        title VARCHAR(255) NOT NULL,
-        slug VARCHAR(255) UNIQUE,
-        excerpt VARCHAR(300), 
-        content LONGTEXT NOT NULL,
-        cover_image_url VARCHAR(255),
-        is_published BOOLEAN DEFAULT TRUE,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-        FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE SET NULL
-    );
-"""))
-
-# 5. Contacts (For the Contact Form)
-db.execute(text("""
-    CREATE TABLE IF NOT EXISTS contacts (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        first_name VARCHAR(100),
-        last_name VARCHAR(100),
-        email VARCHAR(100) NOT NULL,
-        subject VARCHAR(150),
-        message TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-"""))
-
-# 6. Subscribers (For the Newsletter)
-db.execute(text("""
-    CREATE TABLE IF NOT EXISTS subscribers (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        email VARCHAR(100) NOT NULL UNIQUE,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-"""))
-
-print("All tables checked/created successfully.")
+# Database Connection: MySQL by default, or the embedded SQLite engine (see backends.py)
+backend = backends.from_env()
+
+# "sync" (pymysql on the threadpool) or "async" (aiomysql on the event loop), so both can be A/B tested
+DB_MODE = os.getenv("db_mode", "sync")
+
+pool_options = dict(
+    pool_pre_ping=True,   # <--- Checks connection before using it
+    pool_recycle=1800,    # <--- Refreshes connection every 30 mins
+    pool_size=int(os.getenv("db_pool_size", 10)),
+    max_overflow=int(os.getenv("db_max_overflow", 20)),
+    pool_timeout=int(os.getenv("db_pool_timeout", 30)),
+)
+
+# Importing this module does no I/O: the engine is built on first use (the app
+# lifespan, or a manage.py command) and connections are opened lazily by the pool.
+engine = None
+async_engine = None
+_engine_lock = threading.Lock()
+SessionLocal = sessionmaker()
+AsyncSessionLocal = async_sessionmaker(expire_on_commit=False)
+
+
+# SQL latency per statement, labelled with the manager method that issued it
+# (metrics.current_operation, set by @metrics.instrument on the managers). The same
+# timing feeds sampled profiles and, past slow_query_ms, the slow-query log.
+def instrument_engine(sync_engine):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        operation = metrics.current_operation.get()
+        metrics.observe("sql.statement", elapsed, (("operation", operation),))
+        profiling.record("sql.execute", elapsed)
+        if profiling.SLOW_QUERY_MS and elapsed * 1000 >= profiling.SLOW_QUERY_MS:
+            metrics.incr("sql.slow_queries", labels=(("operation", operation),))
+            profiling.log_slow_query(conn, statement, parameters, elapsed, executemany, operation, backend.explain_prefix)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        metrics.incr("sql.errors", labels=(("operation", metrics.current_operation.get()),))
+
+
+def get_engine():
+    global engine
+    if engine is None:
+        with _engine_lock:
+            if engine is None:
+                engine = backend.create_engine(pool_options)
+                instrument_engine(engine)
+                SessionLocal.configure(bind=engine)
+    return engine
+
+
+def get_async_engine():
+    global async_engine
+    if async_engine is None:
+        with _engine_lock:
+            if async_engine is None:
+                async_engine = backend.create_async_engine(pool_options)
+                instrument_engine(async_engine.sync_engine)
+                AsyncSessionLocal.configure(bind=async_engine)
+    return async_engine
+
+
+def get_backend():
+    return backend
+
+
+# Switches backend before any engine is used (benchmarks, tests); engines are rebuilt on next use
+def use_backend(new_backend):
+    global backend, engine, async_engine
+    with _engine_lock:
+        if engine is not None:
+            engine.dispose()
+        if async_engine is not None:
+            async_engine.sync_engine.dispose()
+        backend, engine, async_engine = new_backend, None, None
+
+
+def dispose_engine():
+    global engine
+    if engine is not None:
+        engine.dispose()
+        engine = None
+
+
+async def dispose_async_engine():
+    global async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+
+
+# --- REQUEST SCOPED SESSIONS ---
+# Every request gets its own Session (and its own pooled connection) instead of
+# sharing one module-global Session across the whole threadpool.
+def get_db():
+    get_engine()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        with profiling.span("dependency:get_db"):
+            db.connection()  # Check a connection out of the pool up front so we can time the wait
+        metrics.observe("db.pool.checkout_wait", time.perf_counter() - started)
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()  # <--- Returns the connection to the pool
+
+
+def pool_stats(current=None):
+    current = current or engine
+    if current is None:
+        return {}
+    pool = current.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+# --- ASYNC SESSIONS (db_mode=async) ---
+async def get_async_db():
+    get_async_engine()
+    db = AsyncSessionLocal()
+    started = time.perf_counter()
+    try:
+        with profiling.span("dependency:get_async_db"):
+            await db.connection()
+        metrics.observe("db.async_pool.checkout_wait", time.perf_counter() - started)
+        yield db
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
+
+metrics.register_gauge("db.pool", pool_stats)
+metrics.register_gauge("db.async_pool", lambda: pool_stats(async_engine.sync_engine) if async_engine else {})
+
+
+# Schema changes live in migrations.py and are applied at deploy time, not on import.
 
 # from sqlalchemy import create_engine, text
 # from sqlalchemy.orm import sessionmaker
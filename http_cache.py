@@ -0,0 +1,129 @@
+# backend/http_cache.py
+# Conditional request helpers (ETag / Last-Modified / 304) for the public article routes.
+import gzip
+import hashlib
+import os
+import zlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only without it
+    brotli = None
+
+ARTICLE_MAX_AGE = int(os.getenv("article_max_age", 60))
+CACHE_CONTROL = f"public, max-age={ARTICLE_MAX_AGE}, stale-while-revalidate={ARTICLE_MAX_AGE * 5}"
+
+
+# Strong ETag from the parts that identify one representation
+def make_etag(*parts):
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+# DB timestamps are stored in UTC
+def http_date(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def validator_headers(etag, last_modified=None):
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+# --- CONTENT ENCODING ---
+# Preferred first; "identity" is always acceptable unless the client rules it out with q=0
+ENCODINGS = ("br", "gzip")
+AVAILABLE_ENCODINGS = ENCODINGS if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding, available):
+    if not accept_encoding:
+        return "identity"
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    for encoding in ENCODINGS:
+        if encoding in available and weights.get(encoding, weights.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def compress(body, encoding, level):
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, level, mtime=0)  # mtime=0: same input, same bytes
+
+
+# Incremental variant for streamed bodies: returns (feed(chunk) -> bytes, finish() -> bytes).
+# Every chunk is flushed so the client can start decoding before the stream ends.
+def stream_compressor(encoding, level):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        return lambda chunk: compressor.process(chunk) + compressor.flush(), compressor.finish
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    return lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+# Each encoding is its own representation, so it gets its own strong ETag: "abc" -> "abc-gzip"
+# (a tag that already names an encoding is returned as-is)
+def encoded_etag(etag, encoding):
+    if encoding == "identity" or _base_etag(etag) != etag:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _base_etag(tag):
+    tag = tag.strip().removeprefix("W/")
+    for encoding in ENCODINGS:
+        if tag.endswith(f'-{encoding}"'):
+            return f'{tag[:-len(encoding) - 2]}"'
+    return tag
+
+
+def _etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    # A validator for any encoding of the same content counts as a match
+    candidates = [_base_etag(tag) for tag in header.split(",")]
+    return _base_etag(etag) in candidates
+
+
+def is_not_modified(request: Request, etag, last_modified=None):
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110 13.2.2)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(headers):
+    return Response(status_code=304, headers=headers)
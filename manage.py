@@ -0,0 +1,46 @@
+# backend/manage.py
+# Deploy-time commands. None of these run when the API process starts.
+#   python manage.py migrate
+#   python manage.py check-plan
+#   python manage.py seed
+#   python manage.py recount
+#   python manage.py rebuild-summaries
+import argparse
+import sys
+
+from database import dispose_engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VerdantVistas backend management")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="Apply pending schema migrations")
+    commands.add_parser("check-plan", help="Fail if the article listing query does a full scan")
+    commands.add_parser("seed", help="Create default categories and the admin user")
+    commands.add_parser("recount", help="Rebuild the per-category published article counts")
+    commands.add_parser("rebuild-summaries", help="Regenerate the article_summaries listing table from posts")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "migrate":
+            from migrations import migrate
+            migrate()
+        elif args.command == "check-plan":
+            from migrations import check_listing_plan
+            return 0 if check_listing_plan() else 1
+        elif args.command == "seed":
+            from seed import seed_database
+            seed_database()
+        elif args.command == "recount":
+            from migrations import recount_categories
+            recount_categories()
+        elif args.command == "rebuild-summaries":
+            from migrations import rebuild_summaries
+            rebuild_summaries()
+    finally:
+        dispose_engine()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
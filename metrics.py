@@ -0,0 +1,224 @@
+# backend/metrics.py
+# In-process metrics registry: counters, up/down gauges, latency histograms and lazy
+# gauges that the rest of the backend reports into. Exposed two ways:
+#   GET /api/stats  -> snapshot(), a JSON summary
+#   GET /metrics    -> render_prometheus(), Prometheus text format
+#
+# Recording is cheap enough to leave on in production: every thread writes only to
+# its own shard (no lock, no contention between threadpool workers), and shards are
+# summed when someone scrapes. The only lock is taken once per thread, to register
+# its shard.
+import bisect
+import contextlib
+import contextvars
+import re
+import threading
+
+import profiling
+
+# Seconds; tuned for request and SQL latencies (Prometheus client defaults plus 1-2.5 ms)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_shards = []
+_shards_lock = threading.Lock()
+_local = threading.local()
+_gauges = {}
+
+# Which manager method is running; SQL timings captured by the engine events in
+# database.py are labelled with it
+current_operation = contextvars.ContextVar("current_operation", default="other")
+
+
+class _Shard:
+    def __init__(self):
+        self.counters = {}    # (name, labels) -> total
+        self.updown = {}      # (name, labels) -> current value (e.g. requests in flight)
+        self.histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum, max]
+
+
+def _shard():
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _local.shard = _Shard()
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+
+# labels: tuple of (name, value) pairs, e.g. (("route", "/api/articles"),)
+def incr(name, amount=1, labels=()):
+    counters = _shard().counters
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + amount
+
+
+def add(name, amount, labels=()):
+    updown = _shard().updown
+    key = (name, labels)
+    updown[key] = updown.get(key, 0) + amount
+
+
+def observe(name, seconds, labels=()):
+    histograms = _shard().histograms
+    key = (name, labels)
+    stat = histograms.get(key)
+    if stat is None:
+        stat = histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0, 0.0]
+    stat[bisect.bisect_left(BUCKETS, seconds)] += 1
+    stat[-2] += seconds
+    if seconds > stat[-1]:
+        stat[-1] = seconds
+
+
+# Gauges are read lazily (e.g. pool sizes) so they cost nothing until someone asks
+def register_gauge(name, fn):
+    _gauges[name] = fn
+
+
+@contextlib.contextmanager
+def operation(name):
+    token = current_operation.set(name)
+    try:
+        yield
+    finally:
+        current_operation.reset(token)
+
+
+# Class decorator: every public method runs under operation("Class.method"), which
+# is also its frame in sampled profiles
+def instrument(cls):
+    for attr, method in list(vars(cls).items()):
+        if attr.startswith("_") or not callable(method):
+            continue
+        setattr(cls, attr, _with_operation(f"{cls.__name__}.{attr}", method))
+    return cls
+
+
+def _with_operation(name, method):
+    def wrapper(*args, **kwargs):
+        token = current_operation.set(name)
+        try:
+            with profiling.span(name):
+                return method(*args, **kwargs)
+        finally:
+            current_operation.reset(token)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+# --- AGGREGATION (on scrape) ---
+# dict() copies are atomic under the GIL, so owners keep writing while we read
+def _collect():
+    with _shards_lock:
+        shards = list(_shards)
+    counters, updown, histograms = {}, {}, {}
+    for shard in shards:
+        for key, value in dict(shard.counters).items():
+            counters[key] = counters.get(key, 0) + value
+        for key, value in dict(shard.updown).items():
+            updown[key] = updown.get(key, 0) + value
+        for key, stat in dict(shard.histograms).items():
+            stat = list(stat)
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = stat
+            else:
+                for i in range(len(stat) - 1):
+                    total[i] += stat[i]
+                total[-1] = max(total[-1], stat[-1])
+    return counters, updown, histograms
+
+
+# One broken gauge (e.g. a pool that is being disposed) must not take the whole scrape down
+def _read_gauges():
+    values = {}
+    for name, fn in list(_gauges.items()):
+        try:
+            values[name] = fn()
+        except Exception as e:
+            print(f"Metrics gauge {name} failed: {e}")
+    return values
+
+
+def _display_name(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{key}={value}" for key, value in labels) + "}"
+
+
+def snapshot():
+    counters, updown, histograms = _collect()
+    timings = {}
+    for (name, labels), stat in histograms.items():
+        count = sum(stat[:-2])
+        timings[_display_name(name, labels)] = {
+            "count": count,
+            "avg_ms": round(stat[-2] / count * 1000, 3) if count else 0.0,
+            "max_ms": round(stat[-1] * 1000, 3),
+        }
+    counters = {_display_name(name, labels): value for (name, labels), value in {**counters, **updown}.items()}
+    gauges = _read_gauges()
+    return {"counters": counters, "timings": timings, "gauges": gauges}
+
+
+# --- PROMETHEUS TEXT FORMAT ---
+def _metric_name(name, suffix=""):
+    name = re.sub(r"[^a-zA-Z0-9_]", "_", name)
+    return name if not suffix or name.endswith(suffix) else name + suffix
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{_metric_name(key)}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def _group(series):
+    grouped = {}
+    for (name, labels), value in series.items():
+        grouped.setdefault(name, []).append((labels, value))
+    return sorted(grouped.items())
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, bool):
+        out[prefix] = int(value)
+    elif isinstance(value, (int, float)):
+        out[prefix] = value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}_{key}", item, out)
+
+
+def render_prometheus():
+    counters, updown, histograms = _collect()
+    lines = []
+    for name, series in _group(counters):
+        metric = _metric_name(name, "_total")
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f"{metric}{_label_text(labels)} {value}" for labels, value in series)
+    for name, series in _group(updown):
+        metric = _metric_name(name)
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(f"{metric}{_label_text(labels)} {value}" for labels, value in series)
+    for name, series in _group(histograms):
+        metric = _metric_name(name, "_seconds")
+        lines.append(f"# TYPE {metric} histogram")
+        for labels, stat in series:
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), stat[:-2]):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{metric}_sum{_label_text(labels)} {stat[-2]}")
+            lines.append(f"{metric}_count{_label_text(labels)} {cumulative}")
+    for name, value in sorted(_read_gauges().items()):
+        flat = {}
+        _flatten(_metric_name(name), value, flat)
+        for metric, value in sorted(flat.items()):
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,26 +1,420 @@
 # backend/middleware.py
 import jwt
+import hashlib
+import threading
+import time
 from dotenv import load_dotenv
 import os
 from datetime import datetime, timedelta
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from starlette.datastructures import Headers, MutableHeaders
+
+import metrics
+import profiling
+from cache import TTLCache
+from database import get_engine
+from http_cache import AVAILABLE_ENCODINGS, compress, encoded_etag, negotiate_encoding, stream_compressor
 
 bearer = HTTPBearer()
+optional_bearer = HTTPBearer(auto_error=False)  # For routes where only some parameters need a token
 load_dotenv()
 secret_key = os.getenv("secret_key", "supersecretkey")
 
+# --- VERIFIED TOKEN CACHE ---
+# Tokens that already passed the HMAC check, keyed by their SHA-256 digest (the raw
+# token is never stored) and expiring no later than the token's own `exp`.
+token_cache = TTLCache(
+    "tokens",
+    maxsize=int(os.getenv("token_cache_size", 4096)),
+    ttl=float(os.getenv("token_cache_ttl", 300)),
+)
+
+# --- REVOCATION ---
+# token id -> exp. A token id is the digest of one token (a rotated refresh token, or
+# a token issued before sessions existed) or "sid:<session id>" for a logged-out
+# session: every access and refresh token issued from one login carries its sid.
+# Checked on every request (after the cache lookup) so logout takes effect at once.
+# Persisted in token_revocations (migration 9) so a restart doesn't bring revoked
+# tokens back. Each process loads the table on its first auth check and re-reads it
+# at most every revocation_reload_interval seconds, so a logout or revoke-all made by
+# another worker takes effect here within that interval. The refresh path doesn't
+# wait for the reload: it checks the table directly (see decode_refresh_token).
+REVOCATION_RELOAD_INTERVAL = float(os.getenv("revocation_reload_interval", 5))
+_revoked = {}
+_revoked_lock = threading.Lock()
+_revoked_before = 0  # Tokens issued (iat) before this are rejected; set by revoke_all_tokens()
+_revocations_loaded_at = None  # time.monotonic() of the last load
+ALL_TOKENS = "*"  # token_revocations row for revoke_all_tokens(); its revoked_at is _revoked_before
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _revocations_fresh():
+    return _revocations_loaded_at is not None and time.monotonic() - _revocations_loaded_at < REVOCATION_RELOAD_INTERVAL
+
+
+def _load_revocations():
+    global _revoked_before, _revocations_loaded_at
+    if _revocations_fresh():
+        return
+    with _revoked_lock:
+        if _revocations_fresh():
+            return
+        first_load = _revocations_loaded_at is None
+        now = int(time.time())
+        try:
+            with metrics.operation("TokenRevocations.load"), get_engine().begin() as conn:
+                if first_load:
+                    conn.execute(
+                        text("DELETE FROM token_revocations WHERE expires_at <= :now AND token_id <> :all"),
+                        {"now": now, "all": ALL_TOKENS}
+                    )
+                rows = conn.execute(
+                    text("SELECT token_id, revoked_at, expires_at FROM token_revocations WHERE expires_at > :now OR token_id = :all"),
+                    {"now": now, "all": ALL_TOKENS}
+                ).all()
+        except Exception as e:
+            print(f"Error loading token revocations: {e}")
+            if first_load:
+                raise HTTPException(status_code=500, detail="Could not load token revocations")
+            _revocations_loaded_at = time.monotonic()  # Keep what we have, retry after the interval
+            return
+        revoked_before = _revoked_before
+        for token_id, revoked_at, expires_at in rows:
+            if token_id == ALL_TOKENS:
+                revoked_before = max(revoked_before, revoked_at)
+            else:
+                _revoked[token_id] = max(_revoked.get(token_id, 0), expires_at)
+        if revoked_before > _revoked_before:
+            _revoked_before = revoked_before
+            token_cache.clear()  # Cached users were verified against the old cutoff
+        _revocations_loaded_at = time.monotonic()
+
+
+def _persist_revocation(token_id, revoked_at, expires_at):
+    try:
+        with metrics.operation("TokenRevocations.persist"), get_engine().begin() as conn:
+            conn.execute(text("DELETE FROM token_revocations WHERE token_id = :id"), {"id": token_id})
+            conn.execute(
+                text("INSERT INTO token_revocations (token_id, revoked_at, expires_at) VALUES (:id, :revoked, :expires)"),
+                {"id": token_id, "revoked": revoked_at, "expires": expires_at}
+            )
+    except Exception as e:
+        print(f"Error persisting token revocation: {e}")
+        raise HTTPException(status_code=500, detail="Could not revoke token")
+
+
+def _revoke(token_id, exp):
+    _load_revocations()
+    now = time.time()
+    with _revoked_lock:
+        for stale in [d for d, expires in _revoked.items() if expires <= now]:
+            del _revoked[stale]  # Expired tokens fail verification anyway
+        _revoked[token_id] = exp
+    _persist_revocation(token_id, int(now), int(exp))
+
+
+def revoke_token(token):
+    digest = token_digest(token)
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp") or time.time() + 86400
+    except jwt.InvalidTokenError:
+        exp = time.time() + 86400
+    _revoke(digest, exp)
+    token_cache.delete(digest)
+
+
+# Logout: kills every token of the session. exp must cover the session's newest
+# refresh token, i.e. now + the refresh token lifetime.
+def revoke_session(sid, exp):
+    _revoke(f"sid:{sid}", exp)
+
+
+# Key rotation / "log out everywhere": every token issued before now stops working
+def revoke_all_tokens():
+    global _revoked_before
+    _load_revocations()
+    _revoked_before = int(time.time())  # Whole seconds, like the iat claim
+    token_cache.clear()
+    _persist_revocation(ALL_TOKENS, _revoked_before, _revoked_before)
+
+
+def _is_revoked(digest, sid):
+    return digest in _revoked or (sid is not None and f"sid:{sid}" in _revoked)
+
+
 def verify_token(request: HTTPAuthorizationCredentials = Security(bearer)):
+    _load_revocations()
     token = request.credentials
+    digest = token_digest(token)
+
+    user = token_cache.get(digest)
+    if user is None:
+        user = _decode_access_token(token, digest)
+    if _is_revoked(digest, user["sid"]):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return user
+
+
+def _decode_access_token(token, digest):
+    started = time.perf_counter()
     try:
         # Decode token
-        payload = jwt.decode(token, secret_key, algorithms=["HS256"])
-        return {
-            "id": payload.get("id"),
-            "email": payload.get("email"),
-            "userType": payload.get("userType"), # Safely get userType
-        }
+        with profiling.span("dependency:verify_token"):
+            payload = jwt.decode(token, secret_key, algorithms=["HS256"])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Invalid token")
+    finally:
+        metrics.observe("auth.verify", time.perf_counter() - started)
+
+    if payload.get("iat", 0) < _revoked_before:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    if payload.get("type") == "refresh":
+        raise HTTPException(status_code=401, detail="Invalid token")  # Refresh tokens only work on /api/auth/refresh
+
+    user = {
+        "id": payload.get("id"),
+        "email": payload.get("email"),
+        "userType": payload.get("userType"), # Safely get userType
+        "sid": payload.get("sid"),
+    }
+    if "exp" in payload:
+        token_cache.set(digest, user, ttl=min(token_cache.ttl, payload["exp"] - time.time()))
+    else:
+        token_cache.set(digest, user)
+    return user
+
+
+# Full check for refresh tokens (never cached: they're used once and then rotated)
+def decode_refresh_token(token):
+    _load_revocations()
+    digest = token_digest(token)
+    if digest in _revoked:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    try:
+        payload = jwt.decode(token, secret_key, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Refresh token has expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("type") != "refresh" or payload.get("iat", 0) < _revoked_before:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if _is_revoked(digest, payload.get("sid")) or _revoked_in_db(digest, payload.get("sid"), payload.get("iat", 0)):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return payload
+
+
+# Refreshes are rare and a missed revocation there mints new tokens, so this path reads
+# the table itself instead of trusting a copy that may be one reload interval old
+def _revoked_in_db(digest, sid, iat):
+    try:
+        with metrics.operation("TokenRevocations.check"), get_engine().connect() as conn:
+            rows = conn.execute(
+                text("SELECT token_id, revoked_at FROM token_revocations WHERE token_id IN (:digest, :sid, :all)"),
+                {"digest": digest, "sid": f"sid:{sid}" if sid else digest, "all": ALL_TOKENS}
+            ).all()
+    except Exception as e:
+        print(f"Error checking token revocations: {e}")
+        raise HTTPException(status_code=500, detail="Could not check token revocations")
+    return any(token_id != ALL_TOKENS or iat < revoked_at for token_id, revoked_at in rows)
+
+
+# Refresh tokens are single use across workers: the first INSERT of a token's digest
+# wins, and any other request presenting the same token hits the primary key
+def consume_refresh_token(token, exp):
+    digest = token_digest(token)
+    now = int(time.time())
+    try:
+        with metrics.operation("TokenRevocations.consume"), get_engine().begin() as conn:
+            conn.execute(
+                text("INSERT INTO token_revocations (token_id, revoked_at, expires_at) VALUES (:id, :revoked, :expires)"),
+                {"id": digest, "revoked": now, "expires": int(exp)}
+            )
+    except IntegrityError:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    except Exception as e:
+        print(f"Error persisting token revocation: {e}")
+        raise HTTPException(status_code=500, detail="Could not revoke token")
+    with _revoked_lock:
+        _revoked[digest] = exp
+
+
+# --- RESPONSE COMPRESSION ---
+# Negotiated gzip/brotli for JSON and text responses of at least compression_min_size
+# bytes. Levels are kept moderate because this runs per response (the article
+# snapshots are pre-compressed at the maximum level instead, and pass through here
+# untouched since they already carry a Content-Encoding).
+COMPRESSION_MIN_SIZE = int(os.getenv("compression_min_size", 1024))
+GZIP_LEVEL = int(os.getenv("compression_gzip_level", 6))
+BROTLI_QUALITY = int(os.getenv("compression_brotli_quality", 4))
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Identical bodies are compressed once and reused: encoding + body digest -> compressed
+# bytes. Keyed on the bytes themselves, not the ETag: not every compressible response
+# carries one, and nothing here has to trust that a route's ETag names its body.
+compressed_cache = TTLCache(
+    "compressed",
+    maxsize=int(os.getenv("compressed_cache_size", 256)),
+    ttl=float(os.getenv("compressed_cache_ttl", 300)),
+)
+
+
+def compressed_body(body, encoding):
+    key = (encoding, hashlib.sha1(body).digest())
+    compressed = compressed_cache.get(key)
+    if compressed is None:
+        started = time.perf_counter()
+        with profiling.span("compress"):
+            compressed = compress(body, encoding, BROTLI_QUALITY if encoding == "br" else GZIP_LEVEL)
+        metrics.observe(f"compression.{encoding}", time.perf_counter() - started)
+        compressed_cache.set(key, compressed)
+    return compressed
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"), AVAILABLE_ENCODINGS)
+        if encoding == "identity":
+            return await self.app(scope, receive, send)
+        await self.app(scope, receive, CompressingSend(send, encoding))
+
+
+class CompressingSend:
+    def __init__(self, send, encoding):
+        self.send = send
+        self.encoding = encoding
+        self.start = None
+        self.passthrough = False
+        self.feed = None  # Set once a streamed body is being compressed
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if message["status"] in (200, 304) and "etag" in headers:
+                # Tagged for the negotiated encoding whether or not this body ends up
+                # compressed, so a 304 always repeats the ETag its 200 carried
+                self._encode_etag(MutableHeaders(scope=message))
+            self.passthrough = (
+                message["status"] != 200
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if self.passthrough:
+                return await self.send(message)
+            self.start = message  # Held until we know the body size
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            return await self.send(message)
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.feed is not None:
+            chunk = self.feed(body)
+            if not more_body:
+                chunk += self.finish()
+            return await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        headers = MutableHeaders(scope=self.start)
+        if not more_body:
+            if len(body) < COMPRESSION_MIN_SIZE:
+                self.passthrough = True
+                await self.send(self.start)
+                return await self.send(message)
+            body = compressed_body(body, self.encoding)
+            headers["Content-Length"] = str(len(body))
+            self._mark_encoded(headers)
+            await self.send(self.start)
+            return await self.send({"type": "http.response.body", "body": body, "more_body": False})
+
+        # Streamed body: compress chunk by chunk, nothing to cache
+        self.feed, self.finish = stream_compressor(self.encoding, BROTLI_QUALITY if self.encoding == "br" else GZIP_LEVEL)
+        if "content-length" in headers:
+            del headers["content-length"]
+        self._mark_encoded(headers)
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": self.feed(body), "more_body": True})
+
+    def _mark_encoded(self, headers):
+        headers["Content-Encoding"] = self.encoding
+        _vary_on_encoding(headers)
+
+    def _encode_etag(self, headers):
+        etag = headers["etag"]
+        if not etag.startswith("W/"):
+            headers["ETag"] = encoded_etag(etag, self.encoding)
+            _vary_on_encoding(headers)
+
+
+def _vary_on_encoding(headers):
+    if "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
+
+
+# --- REQUEST METRICS ---
+# Latency histogram per (method, route template, status) plus requests in flight.
+# Runs on the event loop thread, so it only ever touches that thread's metrics shard.
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        metrics.add("http.requests.in_flight", 1)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.add("http.requests.in_flight", -1)
+            route = scope.get("route")
+            labels = (
+                ("method", scope["method"]),
+                ("route", getattr(route, "path", "unmatched")),  # Template, e.g. /api/articles/{id}
+                ("status", str(status)),
+            )
+            metrics.observe("http.request.duration", time.perf_counter() - started, labels)
+
+
+# --- SAMPLED PROFILING ---
+# profile_sample_rate of requests run with a profiling.Trace in context; the spans they
+# hit are folded into the collapsed stacks under "METHOD /route/template".
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling.should_sample():
+            return await self.app(scope, receive, send)
+
+        trace = profiling.Trace()
+        token = profiling.current_trace.set(trace)
+        trace.push("request")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            trace.pop()
+            profiling.current_trace.reset(token)
+            route = scope.get("route")
+            profiling.collect(trace, f"{scope['method']} {getattr(route, 'path', 'unmatched')}")
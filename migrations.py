@@ -0,0 +1,374 @@
+# backend/migrations.py
+# Versioned schema migrations. Run once per deploy via manage.py, never on import:
+#   python manage.py migrate      -> apply pending migrations
+#   python manage.py check-plan   -> fail if the listing query falls back to a full scan
+#   python manage.py rebuild-summaries -> regenerate article_summaries from posts
+from sqlalchemy import text
+
+from database import get_backend, get_engine
+
+# Recomputes categories.published_count from posts (migration 6, and `manage.py recount`
+# after bulk changes made outside the article write paths)
+RECOUNT_CATEGORIES = """
+    UPDATE categories
+    SET published_count = (
+        SELECT COUNT(*) FROM posts p WHERE p.category_id = categories.id AND p.is_published = TRUE
+    )
+"""
+
+# article_summaries rows derived from posts: one per published article, with the author
+# and category names copied in. {where} picks the posts to (re)derive; the write paths
+# in services.py delete the old row first, a rebuild empties the table.
+SUMMARY_INSERT = """
+    INSERT INTO article_summaries
+        (id, title, excerpt, cover_image_url, category_id, category_name, author_name, created_at, updated_at)
+    SELECT p.id, p.title, p.excerpt, p.cover_image_url, p.category_id, c.name, u.full_name,
+           p.created_at, p.updated_at
+    FROM posts p
+    LEFT JOIN users u ON p.user_id = u.id
+    LEFT JOIN categories c ON p.category_id = c.id
+    WHERE p.is_published = TRUE AND {where}
+"""
+# `manage.py rebuild-summaries`, after bulk changes made outside the article write paths
+# (or a category/author rename, which the write paths don't propagate)
+REBUILD_SUMMARIES = ["DELETE FROM article_summaries", SUMMARY_INSERT.format(where="TRUE")]
+
+# Listing read model (see SUMMARY_INSERT). Plain SQL that both backends accept as-is.
+# Listings scan (created_at, id) and category feeds (category_id, created_at, id), no joins.
+ARTICLE_SUMMARIES = [
+    """
+    CREATE TABLE article_summaries (
+        id INT PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        excerpt TEXT,
+        cover_image_url VARCHAR(255),
+        category_id INT NULL,
+        category_name VARCHAR(50),
+        author_name VARCHAR(100),
+        created_at TIMESTAMP NULL DEFAULT NULL,
+        updated_at TIMESTAMP NULL DEFAULT NULL,
+        FOREIGN KEY (id) REFERENCES posts(id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX idx_summaries_created ON article_summaries (created_at, id)",
+    "CREATE INDEX idx_summaries_category_created ON article_summaries (category_id, created_at, id)",
+    SUMMARY_INSERT.format(where="TRUE"),
+]
+
+# Logged-out sessions and rotated refresh tokens (middleware.py), so a restart doesn't
+# bring them back. Times are unix seconds. Plain SQL that both backends accept as-is.
+TOKEN_REVOCATIONS = [
+    """
+    CREATE TABLE token_revocations (
+        token_id VARCHAR(64) PRIMARY KEY,
+        revoked_at BIGINT NOT NULL,
+        expires_at BIGINT NOT NULL
+    )
+    """,
+    "CREATE INDEX idx_token_revocations_expires ON token_revocations (expires_at)",
+]
+
+# (version, name, statements) - append new migrations to the end, never edit applied ones
+MIGRATIONS = [
+    (1, "initial_schema", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50) NOT NULL UNIQUE,
+            email VARCHAR(100) NOT NULL UNIQUE,
+            password_hash VARCHAR(255) NOT NULL,
+            full_name VARCHAR(100),
+            userType ENUM('user', 'admin') DEFAULT 'user',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS categories (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(50) NOT NULL,
+            slug VARCHAR(50) NOT NULL UNIQUE
+        )
+        """,
+        # Note: 'image' in frontend maps to 'cover_image_url' here
+        """
+        CREATE TABLE IF NOT EXISTS posts (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            category_id INT NULL,
+            title VARCHAR(255) NOT NULL,
+            slug VARCHAR(255) UNIQUE,
+            excerpt VARCHAR(300),
+            content LONGTEXT NOT NULL,
+            cover_image_url VARCHAR(255),
+            is_published BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE SET NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            first_name VARCHAR(100),
+            last_name VARCHAR(100),
+            email VARCHAR(100) NOT NULL,
+            subject VARCHAR(150),
+            message TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS subscribers (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            email VARCHAR(100) NOT NULL UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    # Formerly patch_db.py
+    (2, "expand_excerpt_to_text", [
+        "ALTER TABLE posts MODIFY COLUMN excerpt TEXT",
+    ]),
+    # Listings filter on is_published and order by (created_at, id); category feeds add category_id.
+    # InnoDB appends the primary key to every secondary index, so both end in id.
+    (3, "listing_indexes", [
+        "CREATE INDEX idx_posts_published_created ON posts (is_published, created_at, id)",
+        "CREATE INDEX idx_posts_category_published_created ON posts (category_id, is_published, created_at)",
+    ]),
+    # Change marker for ETag / Last-Modified; MAX(updated_at) is a single index lookup
+    (4, "posts_updated_at", [
+        "ALTER TABLE posts ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP",
+        "UPDATE posts SET updated_at = created_at",
+        "CREATE INDEX idx_posts_updated ON posts (updated_at)",
+    ]),
+    # Backs GET /api/search (MATCH ... AGAINST), never LIKE scans over LONGTEXT
+    (5, "posts_fulltext", [
+        "ALTER TABLE posts ADD FULLTEXT INDEX ft_posts_search (title, excerpt, content)",
+    ]),
+    # Published-article counts for GET /api/categories, kept by the article write paths
+    (6, "category_published_count", [
+        "ALTER TABLE categories ADD COLUMN published_count INT NOT NULL DEFAULT 0",
+        RECOUNT_CATEGORIES,
+    ]),
+    (7, "article_summaries", ARTICLE_SUMMARIES),
+    # Flushed by view_counter.py; GET /api/articles/popular reads the top of (is_published, views)
+    (8, "posts_views", [
+        "ALTER TABLE posts ADD COLUMN views INT NOT NULL DEFAULT 0",
+        "CREATE INDEX idx_posts_published_views ON posts (is_published, views)",
+    ]),
+    (9, "token_revocations", TOKEN_REVOCATIONS),
+]
+
+
+# The same schema for the embedded SQLite backend (backends.py), version for version so
+# schema_migrations reads the same on both. SQLite has no ON UPDATE, ENUM or FULLTEXT:
+# triggers keep updated_at and the FTS5 index current instead.
+SQLITE_MIGRATIONS = [
+    (1, "initial_schema", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username VARCHAR(50) NOT NULL UNIQUE,
+            email VARCHAR(100) NOT NULL UNIQUE,
+            password_hash VARCHAR(255) NOT NULL,
+            full_name VARCHAR(100),
+            userType VARCHAR(10) DEFAULT 'user' CHECK (userType IN ('user', 'admin')),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(50) NOT NULL,
+            slug VARCHAR(50) NOT NULL UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            category_id INT NULL REFERENCES categories(id) ON DELETE SET NULL,
+            title VARCHAR(255) NOT NULL,
+            slug VARCHAR(255) UNIQUE,
+            excerpt VARCHAR(300),
+            content TEXT NOT NULL,
+            cover_image_url VARCHAR(255),
+            is_published BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name VARCHAR(100),
+            last_name VARCHAR(100),
+            email VARCHAR(100) NOT NULL,
+            subject VARCHAR(150),
+            message TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS subscribers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email VARCHAR(100) NOT NULL UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "expand_excerpt_to_text", []),  # SQLite doesn't enforce VARCHAR lengths
+    (3, "listing_indexes", [
+        "CREATE INDEX idx_posts_published_created ON posts (is_published, created_at, id)",
+        "CREATE INDEX idx_posts_category_published_created ON posts (category_id, is_published, created_at, id)",
+    ]),
+    # ADD COLUMN can't take a CURRENT_TIMESTAMP default here, so triggers fill it in
+    (4, "posts_updated_at", [
+        "ALTER TABLE posts ADD COLUMN updated_at TIMESTAMP",
+        "UPDATE posts SET updated_at = created_at",
+        "CREATE INDEX idx_posts_updated ON posts (updated_at)",
+        """
+        CREATE TRIGGER posts_insert_updated_at AFTER INSERT ON posts
+        WHEN NEW.updated_at IS NULL
+        BEGIN
+            UPDATE posts SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER posts_touch_updated_at AFTER UPDATE ON posts
+        WHEN NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE posts SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+        """,
+    ]),
+    # External-content FTS5 index: stores only the index, reads text from posts
+    (5, "posts_fulltext", [
+        """
+        CREATE VIRTUAL TABLE posts_fts USING fts5(
+            title, excerpt, content, content='posts', content_rowid='id'
+        )
+        """,
+        """
+        CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts (rowid, title, excerpt, content)
+            VALUES (NEW.id, NEW.title, NEW.excerpt, NEW.content);
+        END
+        """,
+        """
+        CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, excerpt, content)
+            VALUES ('delete', OLD.id, OLD.title, OLD.excerpt, OLD.content);
+        END
+        """,
+        """
+        CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, excerpt, content ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, excerpt, content)
+            VALUES ('delete', OLD.id, OLD.title, OLD.excerpt, OLD.content);
+            INSERT INTO posts_fts (rowid, title, excerpt, content)
+            VALUES (NEW.id, NEW.title, NEW.excerpt, NEW.content);
+        END
+        """,
+        "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')",
+    ]),
+    (6, "category_published_count", [
+        "ALTER TABLE categories ADD COLUMN published_count INT NOT NULL DEFAULT 0",
+        RECOUNT_CATEGORIES,
+    ]),
+    (7, "article_summaries", ARTICLE_SUMMARIES),
+    # The updated_at trigger now lists the columns an edit can change, so the view
+    # counter's UPDATEs don't count as edits
+    (8, "posts_views", [
+        "ALTER TABLE posts ADD COLUMN views INT NOT NULL DEFAULT 0",
+        "CREATE INDEX idx_posts_published_views ON posts (is_published, views)",
+        "DROP TRIGGER posts_touch_updated_at",
+        """
+        CREATE TRIGGER posts_touch_updated_at
+        AFTER UPDATE OF user_id, category_id, title, slug, excerpt, content, cover_image_url, is_published, created_at
+        ON posts
+        WHEN NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE posts SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+        """,
+    ]),
+    (9, "token_revocations", TOKEN_REVOCATIONS),
+]
+
+MIGRATIONS_BY_BACKEND = {"mysql": MIGRATIONS, "sqlite": SQLITE_MIGRATIONS}
+
+def applied_versions(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def migrate():
+    print("🛠️ Running migrations...")
+    engine = get_engine()
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+
+    pending = [m for m in MIGRATIONS_BY_BACKEND[get_backend().name] if m[0] not in done]
+    if not pending:
+        print("✅ Schema is up to date.")
+        return
+
+    for version, name, statements in pending:
+        print(f"Applying {version:04d}_{name}...")
+        # MySQL commits DDL implicitly, so each migration is recorded right after it runs
+        # (SQLite DDL is transactional: there the whole migration commits or none of it)
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": version, "name": name},
+            )
+    print(f"✅ Applied {len(pending)} migration(s).")
+
+
+def recount_categories():
+    with get_engine().begin() as conn:
+        conn.execute(text(RECOUNT_CATEGORIES))
+    print("✅ Category counts rebuilt.")
+
+
+def rebuild_summaries():
+    # One transaction: readers see the old summaries until the new ones are complete
+    with get_engine().begin() as conn:
+        for statement in REBUILD_SUMMARIES:
+            conn.execute(text(statement))
+        total = conn.execute(text("SELECT COUNT(*) FROM article_summaries")).scalar()
+    print(f"✅ Article summaries rebuilt ({total} published articles).")
+
+
+# --- QUERY PLAN CHECK ---
+def check_listing_plan():
+    from services import listing_query
+
+    variants = {
+        "first page": ([], {}),
+        "next page": (
+            ["s.created_at <= :cursor_ts AND (s.created_at < :cursor_ts OR s.id < :cursor_id)"],
+            {"cursor_ts": "2100-01-01 00:00:00", "cursor_id": 0},
+        ),
+        "category feed": (["s.category_id = :category_id"], {"category_id": 1}),
+    }
+    problems = []
+    with get_engine().connect() as conn:
+        for label, (conditions, params) in variants.items():
+            query = listing_query("summary", conditions)
+            problems += get_backend().plan_problems(conn, label, query, {"limit": 21, **params})
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        return False
+    print("✅ Listing query uses an index range scan.")
+    return True
+
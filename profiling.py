@@ -0,0 +1,138 @@
+# backend/profiling.py
+# Opt-in request profiling and the slow-query log.
+#
+# Sampling: with profile_sample_rate > 0, that fraction of requests gets a Trace
+# (ProfilingMiddleware in middleware.py). Code marks phases with span(); the manager
+# methods (@metrics.instrument), dependency setup, SQL execute, row fetch, Pydantic
+# validation, JSON encoding and compression are already marked. Unsampled requests
+# pay one contextvar lookup per span.
+#
+# Finished traces are folded into collapsed stacks ("GET /api/articles;ArticleManager.
+# get_all_articles;sql.execute 1234", self time in microseconds), the input format of
+# flamegraph.pl / speedscope / inferno. GET /api/profile returns them.
+#
+# Slow queries: any statement slower than slow_query_ms is logged with its bound
+# parameters redacted and, for SELECTs on the sync engine, its EXPLAIN plan.
+import contextlib
+import contextvars
+import datetime
+import random
+import threading
+import time
+import os
+
+SAMPLE_RATE = float(os.getenv("profile_sample_rate", 0))
+SLOW_QUERY_MS = float(os.getenv("slow_query_ms", 0))  # 0 = off
+EXPLAIN_INTERVAL = float(os.getenv("slow_query_explain_interval", 60))  # Per statement, seconds
+
+current_trace = contextvars.ContextVar("profile_trace", default=None)
+
+_stacks = {}  # "frame;frame;frame" -> microseconds of self time
+_stacks_lock = threading.Lock()
+_explained = {}  # statement -> last EXPLAIN time
+
+
+class Trace:
+    def __init__(self):
+        self.frames = []  # [name, started, seconds spent in children]
+        self.samples = {}  # (frame, ...) -> self seconds
+
+    def push(self, name):
+        self.frames.append([name, time.perf_counter(), 0.0])
+
+    def pop(self):
+        name, started, children = self.frames.pop()
+        elapsed = time.perf_counter() - started
+        self._add(name, elapsed - children)
+        if self.frames:
+            self.frames[-1][2] += elapsed
+
+    # A leaf measured elsewhere (e.g. between two SQLAlchemy events)
+    def record(self, name, seconds):
+        self._add(name, seconds)
+        if self.frames:
+            self.frames[-1][2] += seconds
+
+    def _add(self, name, seconds):
+        path = tuple(frame[0] for frame in self.frames) + (name,)
+        self.samples[path] = self.samples.get(path, 0.0) + seconds
+
+
+def should_sample():
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+@contextlib.contextmanager
+def span(name):
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    trace.push(name)
+    try:
+        yield
+    finally:
+        trace.pop()
+
+
+def record(name, seconds):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.record(name, seconds)
+
+
+# The root frame is renamed to the route template once routing has happened
+def collect(trace, root):
+    with _stacks_lock:
+        for path, seconds in trace.samples.items():
+            key = ";".join((root,) + path[1:])
+            _stacks[key] = _stacks.get(key, 0) + max(0, int(seconds * 1_000_000))
+
+
+def render_collapsed():
+    with _stacks_lock:
+        return "".join(f"{stack} {micros}\n" for stack, micros in sorted(_stacks.items()))
+
+
+def reset():
+    with _stacks_lock:
+        _stacks.clear()
+
+
+# --- SLOW QUERY LOG ---
+# Strings may be emails, tokens or message bodies: keep only their length
+def redact(parameters):
+    if isinstance(parameters, dict):
+        return {key: redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(value) for value in parameters]
+    if isinstance(parameters, (str, bytes)):
+        return f"<{type(parameters).__name__} len={len(parameters)}>"
+    if isinstance(parameters, (datetime.date, datetime.datetime)):
+        return parameters.isoformat()
+    return parameters
+
+
+def log_slow_query(conn, statement, parameters, seconds, executemany, operation, explain_prefix="EXPLAIN "):
+    summary = " ".join(statement.split())
+    if summary.upper().startswith("EXPLAIN"):
+        return  # Our own plan lookups
+    print(f"Slow query ({seconds * 1000:.1f} ms, {operation}): {summary[:500]} params={redact(parameters)}")
+    if executemany or not summary.upper().startswith("SELECT") or conn.dialect.is_async:
+        return
+    now = time.monotonic()
+    if now - _explained.get(statement, -EXPLAIN_INTERVAL) < EXPLAIN_INTERVAL:
+        return
+    _explained[statement] = now
+    # On another connection and thread: the slow one may still be streaming its result
+    threading.Thread(target=_explain, args=(conn.engine, explain_prefix + statement, parameters), daemon=True).start()
+
+
+def _explain(engine, statement, parameters):
+    try:
+        with engine.connect() as conn:
+            plan = conn.exec_driver_sql(statement, parameters).mappings().all()
+        for row in plan:
+            print(f"  EXPLAIN: {dict(row)}")
+    except Exception as e:
+        print(f"  EXPLAIN failed: {e}")
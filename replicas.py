@@ -0,0 +1,250 @@
+# backend/replicas.py
+# Read-replica routing for the public read routes.
+#
+#   db_replicas=10.0.0.2,10.0.0.3:3307     MySQL replicas (host[:port], same credentials)
+#   db_replicas=/srv/blog/replica.db       SQLite copies (db_backend=sqlite), opened read-only
+#   replica_strategy=round_robin | least_connections
+#
+# Reads (listings, category feeds, search, snapshot misses) go to a healthy replica;
+# admin writes and every other route use the primary. A background thread checks each
+# replica every replica_check_interval seconds and takes it out of rotation while it
+# is unreachable or more than replica_max_lag seconds behind.
+#
+# Read-your-writes: after an article write, reads in this process go to the primary for
+# read_your_writes_window seconds (so the caches the write just cleared aren't refilled
+# from a lagging replica), and the admin gets a cookie that keeps their own reads on the
+# primary for the same window whichever worker serves them.
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import Request
+from sqlalchemy import DateTime, text
+
+import database
+import metrics
+import profiling
+
+REPLICAS = [entry.strip() for entry in os.getenv("db_replicas", "").split(",") if entry.strip()]
+STRATEGY = os.getenv("replica_strategy", "round_robin")
+CHECK_INTERVAL = float(os.getenv("replica_check_interval", 5))
+MAX_LAG = float(os.getenv("replica_max_lag", 10))
+READ_YOUR_WRITES_WINDOW = float(os.getenv("read_your_writes_window", 10))
+PRIMARY_COOKIE = "read_primary_until"
+
+NEWEST_ROW = text("SELECT MAX(updated_at) AS newest FROM posts").columns(newest=DateTime)
+
+
+class Replica:
+    def __init__(self, name, backend):
+        self.name = name
+        self.backend = backend
+        self.healthy = None  # Out of rotation until the first check passes
+        self.lag = None
+        self.engine = None
+        self.async_engine = None
+        self._lock = threading.Lock()
+
+    def get_engine(self):
+        if self.engine is None:
+            with self._lock:
+                if self.engine is None:
+                    engine = self.backend.create_engine(database.pool_options)
+                    database.instrument_engine(engine)
+                    self.engine = engine
+        return self.engine
+
+    def get_async_engine(self):
+        if self.async_engine is None:
+            with self._lock:
+                if self.async_engine is None:
+                    engine = self.backend.create_async_engine(database.pool_options)
+                    database.instrument_engine(engine.sync_engine)
+                    self.async_engine = engine
+        return self.async_engine
+
+    def in_use(self):
+        engine = self.async_engine.sync_engine if database.DB_MODE == "async" and self.async_engine else self.engine
+        try:
+            return engine.pool.checkedout() if engine else 0
+        except AttributeError:  # Pools without counters (e.g. StaticPool)
+            return 0
+
+    def mark(self, healthy, reason=None):
+        if healthy != self.healthy:
+            print(f"Replica {self.name} {'back in rotation' if healthy else f'out of rotation: {reason}'}")
+            metrics.incr("db.replica.state_changes", labels=(("replica", self.name), ("healthy", str(healthy).lower())))
+        self.healthy = healthy
+
+
+class ReplicaRouter:
+    def __init__(self, entries, strategy=STRATEGY):
+        self.replicas = [Replica(f"replica{i + 1}", database.backend.replica(entry)) for i, entry in enumerate(entries)]
+        self.strategy = strategy
+        self.last_write = float("-inf")
+        self._turn = itertools.count()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- ROUTING ---
+    def choose(self, request=None):
+        if not self.replicas:
+            return None
+        if request is not None and _pinned_until(request) > time.time():
+            return self._route(None, "read_your_writes")
+        if time.monotonic() - self.last_write < READ_YOUR_WRITES_WINDOW:
+            return self._route(None, "recent_write")
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return self._route(None, "no_healthy_replica")
+        if self.strategy == "least_connections":
+            return self._route(min(healthy, key=Replica.in_use), "read")
+        return self._route(healthy[next(self._turn) % len(healthy)], "read")
+
+    def _route(self, replica, reason):
+        metrics.incr("db.route", labels=(("target", replica.name if replica else "primary"), ("reason", reason)))
+        return replica
+
+    def note_write(self, response=None):
+        self.last_write = time.monotonic()
+        if response is not None and self.replicas:
+            until = int(time.time() + READ_YOUR_WRITES_WINDOW) + 1
+            response.set_cookie(PRIMARY_COOKIE, str(until), max_age=int(READ_YOUR_WRITES_WINDOW) + 1,
+                                httponly=True, samesite="lax")
+
+    # --- HEALTH CHECKS ---
+    def check(self):
+        primary_newest = None
+        for replica in self.replicas:
+            try:
+                with replica.get_engine().connect() as conn:
+                    lag = replica.backend.replica_lag(conn)
+                    if lag is None:
+                        # Upper bound on staleness: how far the replica's newest post trails the primary's
+                        newest = conn.execute(NEWEST_ROW).scalar()
+                        if primary_newest is None:
+                            with database.get_engine().connect() as primary:
+                                primary_newest = primary.execute(NEWEST_ROW).scalar()
+                        lag = max(0.0, (primary_newest - newest).total_seconds()) if primary_newest and newest else 0.0
+            except Exception as e:
+                replica.lag = None
+                metrics.incr("db.replica.check_failures", labels=(("replica", replica.name),))
+                replica.mark(False, f"unreachable ({e.__class__.__name__}: {e})")
+                continue
+            replica.lag = float(lag)
+            metrics.observe("db.replica.lag", replica.lag, (("replica", replica.name),))
+            if replica.lag > MAX_LAG:
+                replica.mark(False, f"{replica.lag:.1f}s behind")
+            else:
+                replica.mark(True)
+
+    def _loop(self):
+        # The first check runs here, not in start(): the lifespan runs on the event loop,
+        # which must not block on connects. Replicas stay out of rotation (healthy=None)
+        # and reads go to the primary until it passes.
+        self.check()
+        while not self._stop.wait(CHECK_INTERVAL):
+            self.check()
+
+    def start(self):
+        if not self.replicas or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for replica in self.replicas:
+            if replica.engine is not None:
+                replica.engine.dispose()
+                replica.engine = None
+
+    async def stop_async(self):
+        self.stop()
+        for replica in self.replicas:
+            if replica.async_engine is not None:
+                await replica.async_engine.dispose()
+                replica.async_engine = None
+
+    def stats(self):
+        return {
+            replica.name: {"healthy": replica.healthy, "lag_seconds": replica.lag, "in_use": replica.in_use()}
+            for replica in self.replicas
+        }
+
+
+def _pinned_until(request):
+    try:
+        return int(request.cookies.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        return 0
+
+
+replica_router = ReplicaRouter(REPLICAS)
+metrics.register_gauge("db.replicas", replica_router.stats)
+
+
+# --- READ SESSIONS ---
+# Like database.get_db / get_async_db, on the replica the router picks. A replica whose
+# connection can't be checked out is taken out of rotation and the read goes to the primary.
+def get_read_db(request: Request):
+    replica = replica_router.choose(request)
+    db = None
+    if replica is not None:
+        db = database.SessionLocal(bind=replica.get_engine())
+        started = time.perf_counter()
+        try:
+            with profiling.span("dependency:get_read_db"):
+                db.connection()
+            metrics.observe("db.replica.checkout_wait", time.perf_counter() - started, (("replica", replica.name),))
+        except Exception as e:
+            db.close()
+            db = None
+            replica.mark(False, f"checkout failed ({e.__class__.__name__})")
+            replica_router._route(None, "replica_failed")
+    if db is None:
+        yield from database.get_db()
+        return
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    replica = replica_router.choose(request)
+    db = None
+    if replica is not None:
+        db = database.AsyncSessionLocal(bind=replica.get_async_engine())
+        started = time.perf_counter()
+        try:
+            with profiling.span("dependency:get_async_read_db"):
+                await db.connection()
+            metrics.observe("db.replica.checkout_wait", time.perf_counter() - started, (("replica", replica.name),))
+        except Exception as e:
+            await db.close()
+            db = None
+            replica.mark(False, f"checkout failed ({e.__class__.__name__})")
+            replica_router._route(None, "replica_failed")
+    if db is None:
+        async with asynccontextmanager(database.get_async_db)() as session:
+            yield session
+        return
+    try:
+        yield db
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
@@ -20,11 +20,11 @@ from pydantic import BaseModel, Field, BeforeValidator
 from typing import Optional
 from datetime import datetime
 
-class ArticleResponse(BaseModel):
+# Card view for listings: everything except the (potentially huge) content body
+class ArticleSummary(BaseModel):
     id: int
     title: str
     excerpt: Optional[str] = None
-    content: str
     
     # 1. READ from DB 'created_at' -> STORE in 'date' -> SEND to Frontend as 'date'
     date: datetime = Field(..., validation_alias="created_at") 
@@ -33,20 +33,45 @@ class ArticleResponse(BaseModel):
     image: Optional[str] = Field(None, validation_alias="cover_image_url")
     
     # 3. READ from DB 'author_name' -> STORE in 'author'
-    author: str = Field(..., validation_alias="author_name")
+    # (None when the author row is gone)
+    author: Optional[str] = Field(None, validation_alias="author_name")
     
     # 4. READ from DB 'category_name' -> STORE in 'category'
-    category: str = Field(..., validation_alias="category_name")
+    # (None for uncategorised posts: imported without one, or their category was deleted)
+    category: Optional[str] = Field(None, validation_alias="category_name")
 
     class Config:
         from_attributes = True
         populate_by_name = True
+
+# Full article (single article page)
+class ArticleResponse(ArticleSummary):
+    content: str
+
+# Search result card: the summary plus its full-text relevance
+class SearchHit(ArticleSummary):
+    score: float
+
+# Popular article card: the summary plus its view count
+class PopularArticle(ArticleSummary):
+    views: int
+
+# Category with its number of published articles
+class CategoryResponse(BaseModel):
+    id: int
+    name: str
+    slug: str
+    count: int
+
 # --- ADMIN / AUTH SCHEMAS ---
 
 class LoginRequest(BaseModel):
     email: str = Field(..., example= "okikisblog@gmail.com")
     password: str = Field(..., example="AdminOkiki")
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class ArticleCreate(BaseModel):
     title: str
     excerpt: str
@@ -55,8 +80,20 @@ class ArticleCreate(BaseModel):
     cover_image_url: str
     is_published: bool = True
 
+# One NDJSON line of POST /api/articles/bulk (the same shape GET /api/articles/export writes)
+class ArticleImport(BaseModel):
+    title: str
+    slug: Optional[str] = None # Defaults to the slugified title, suffixed on collision
+    excerpt: Optional[str] = None
+    content: str
+    category_id: Optional[int] = None
+    cover_image_url: Optional[str] = None
+    is_published: bool = True
+    created_at: Optional[datetime] = None # Keeps the original date when migrating an archive
+
 class ArticleUpdate(BaseModel):
     title: Optional[str] = None
+    slug: Optional[str] = None # Only changes the permalink when sent explicitly
     excerpt: Optional[str] = None
     content: Optional[str] = None
     category_id: Optional[int] = None
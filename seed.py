@@ -1,6 +1,6 @@
 # backend/seed.py
-from database import db
-from sqlalchemy import text
+from database import SessionLocal, get_engine
+from sqlalchemy import bindparam, text
 import os
 from dotenv import load_dotenv
 
@@ -8,20 +8,25 @@ load_dotenv()
 
 def seed_database():
     print("🌱 Seeding Database...")
+    get_engine()
+    db = SessionLocal()
 
     # 1. Seed Categories (These match the filters in your Blog.jsx)
     categories = ["Articles", "Poems", "Image posts", "Stories"]
     
     print("Checking categories...")
-    for cat in categories:
-        slug = cat.lower().replace(" ", "-")
-        # Check if exists first to avoid errors
-        check = db.execute(text("SELECT id FROM categories WHERE slug = :slug"), {"slug": slug}).fetchone()
-        
-        if not check:
-            print(f"Creating category: {cat}")
-            query = text("INSERT INTO categories (name, slug) VALUES (:name, :slug)")
-            db.execute(query, {"name": cat, "slug": slug})
+    slugs = {cat.lower().replace(" ", "-"): cat for cat in categories}
+    # One round-trip for the check and one for the inserts, instead of one per category
+    existing = db.execute(
+        text("SELECT slug FROM categories WHERE slug IN :slugs").bindparams(bindparam("slugs", expanding=True)),
+        {"slugs": list(slugs)}
+    ).scalars().all()
+    missing = [{"name": name, "slug": slug} for slug, name in slugs.items() if slug not in existing]
+
+    if missing:
+        print(f"Creating categories: {', '.join(row['name'] for row in missing)}")
+        query = text("INSERT INTO categories (name, slug) VALUES (:name, :slug)")
+        db.execute(query, missing)
     
     print("✅ Categories synced!")
 
@@ -46,6 +51,7 @@ def seed_database():
         print("⚠️ ADMIN_EMAIL not found in .env, skipping admin creation.")
 
     db.commit()
+    db.close()
     print("🚀 Database Seeded Successfully!")
 
 if __name__ == "__main__":
@@ -1,105 +1,474 @@
 import jwt
+import base64
 import datetime
+import hashlib
+import hmac
 import os
-from sqlalchemy import text
+import re
+import threading
+import unicodedata
+import uuid
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import DBAPIError, IntegrityError, InterfaceError, OperationalError
 from fastapi import HTTPException
 
+import metrics
+import profiling
+from cache import TTLCache
+from database import SessionLocal, get_async_engine, get_backend, get_engine
+from http_cache import make_etag
+from migrations import SUMMARY_INSERT
+from middleware import consume_refresh_token, decode_refresh_token, revoke_session, revoke_token, secret_key
+from responses import dumps, stream_json_array, stream_json_array_async
+from snapshots import article_snapshots
+from writer import writers
+
 # --- USER & AUTH MANAGER ---
-class UserManager:
-    def __init__(self, db_session):
-        self.db = db_session
-        self.secret = os.getenv("secret_key", "supersecretkey")
-        self.admin_email = os.getenv("admin_email")
-        self.admin_pass = os.getenv("admin_password")
+# The admin account is configured in the environment; read it once, not per request
+ADMIN_EMAIL = os.getenv("admin_email")
+ADMIN_PASSWORD = os.getenv("admin_password")
+ACCESS_TOKEN_HOURS = float(os.getenv("access_token_hours", 24))
+REFRESH_TOKEN_DAYS = float(os.getenv("refresh_token_days", 30))  # Revocations are kept this long (token_revocations table)
 
-    def login(self, login_data):
-        # 1. Validation (Outside try/except so 400 errors are returned correctly)
-        if login_data.email != self.admin_email or login_data.password != self.admin_pass:
-            raise HTTPException(status_code=400, detail="Invalid Credentials")
+# The admin's users.id, resolved once per process (or set via admin_id) and then
+# kept in memory, so login is a credential compare plus token signing.
+_admin = {"id": int(os.environ["admin_id"]) if os.getenv("admin_id") else None}
+_admin_lock = threading.Lock()
 
-        try:
-            # 2. Check DB for Admin
-            query = text("SELECT * FROM users WHERE email = :email")
-            user = self.db.execute(query, {"email": self.admin_email}).mappings().fetchone()
 
-            admin_id = None
-            
-            if not user:
-                print("Admin not found in DB. Creating now...")
-                # WRITE OPERATION -> Needs Rollback protection
-                try:
+def resolve_admin_id():
+    if _admin["id"] is not None:
+        return _admin["id"]
+    with _admin_lock:
+        if _admin["id"] is None:
+            get_engine()
+            db = SessionLocal()
+            try:
+                # Check DB for Admin
+                query = text("SELECT id FROM users WHERE email = :email")
+                admin_id = db.execute(query, {"email": ADMIN_EMAIL}).scalar()
+
+                if admin_id is None:
+                    print("Admin not found in DB. Creating now...")
                     insert_query = text("""
                         INSERT INTO users (username, email, password_hash, full_name, userType)
                         VALUES ('admin', :email, 'env_managed', 'Super Admin', 'admin')
                     """)
-                    result = self.db.execute(insert_query, {"email": self.admin_email})
-                    self.db.commit() # Commit changes
-                    admin_id = result.lastrowid
-                except Exception as e:
-                    self.db.rollback() # <--- ROLLBACK ON FAILURE
-                    print(f"Error creating admin: {str(e)}")
-                    raise HTTPException(status_code=500, detail="Could not create admin user")
-            else:
-                admin_id = user.id
-
-            # 3. Generate Token
-            payload = {
-                "id": admin_id,
-                "userType": "admin",
-                "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=24)
-            }
-            token = jwt.encode(payload, self.secret, algorithm="HS256")
-            
-            return {
-                "token": token, 
-                "user": {"name": "Super Admin", "userType": "admin"}
-            }
-            
-        except HTTPException as he:
-            raise he
-        except Exception as e:
-            # Fallback for unexpected read errors
-            raise HTTPException(status_code=500, detail=str(e))
+                    admin_id = db.execute(insert_query, {"email": ADMIN_EMAIL}).lastrowid
+                    db.commit() # Commit changes
+                _admin["id"] = admin_id
+            except Exception as e:
+                db.rollback() # <--- ROLLBACK ON FAILURE
+                print(f"Error resolving admin: {str(e)}")
+                raise HTTPException(status_code=500, detail="Could not load admin user")
+            finally:
+                db.close()
+    return _admin["id"]
+
+
+def _matches(given, expected):
+    # Constant-time, so response timing doesn't leak how much of the secret matched
+    return expected is not None and hmac.compare_digest(given.encode(), expected.encode())
+
+
+@metrics.instrument
+class UserManager:
+    def __init__(self, db_session=None):
+        self.db = db_session
+        self.secret = secret_key
+
+    def login(self, login_data):
+        # 1. Validation (both compares always run)
+        email_ok = _matches(login_data.email, ADMIN_EMAIL)
+        password_ok = _matches(login_data.password, ADMIN_PASSWORD)
+        if not (email_ok and password_ok):
+            raise HTTPException(status_code=400, detail="Invalid Credentials")
+
+        # 2. Generate Tokens
+        return self._issue_tokens(resolve_admin_id())
+
+    # Trade a refresh token for a new access token. Refresh tokens are single use:
+    # the presented one is revoked and a new one is returned with the access token.
+    def refresh(self, refresh_token):
+        payload = decode_refresh_token(refresh_token)
+        consume_refresh_token(refresh_token, payload["exp"])
+        return self._issue_tokens(payload.get("id"), payload.get("sid"))
+
+    # Ends the session: its access token, its refresh token and every pair refreshed
+    # from them share the sid, so all of them stop working
+    def logout(self, user, access_token):
+        if user.get("sid"):
+            exp = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=REFRESH_TOKEN_DAYS)
+            revoke_session(user["sid"], exp.timestamp())
+        else:
+            revoke_token(access_token)  # Issued before tokens carried a session id
+        return {"message": "Logged out"}
+
+    # sid: the login session, kept across refreshes; jti keeps two tokens issued in the
+    # same second distinct, so revoking one never revokes the other
+    def _issue_tokens(self, admin_id, sid=None):
+        now = datetime.datetime.utcnow()
+        sid = sid or uuid.uuid4().hex
+        payload = {
+            "id": admin_id,
+            "userType": "admin",
+            "sid": sid,
+            "jti": uuid.uuid4().hex,
+            "iat": now,
+            "exp": now + datetime.timedelta(hours=ACCESS_TOKEN_HOURS)
+        }
+        token = jwt.encode(payload, self.secret, algorithm="HS256")
+        refresh_token = jwt.encode({
+            "id": admin_id,
+            "type": "refresh",
+            "sid": sid,
+            "jti": uuid.uuid4().hex,
+            "iat": now,
+            "exp": now + datetime.timedelta(days=REFRESH_TOKEN_DAYS)
+        }, self.secret, algorithm="HS256")
+
+        return {
+            "token": token, 
+            "refresh_token": refresh_token,
+            "expires_in": int(ACCESS_TOKEN_HOURS * 3600),
+            "user": {"name": "Super Admin", "userType": "admin"}
+        }
 
 
 # --- ARTICLE MANAGER ---
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_SEARCH_OFFSET = 1000
+BULK_CHUNK_SIZE = int(os.getenv("bulk_chunk_size", 500))  # Rows per import transaction
+EXPORT_BATCH_SIZE = int(os.getenv("export_batch_size", 500))  # Rows fetched per server-side cursor read
+# Streamed listings (?stream=true, admins only) may ask for up to max_stream_rows rows;
+# memory per request is bounded by stream_batch_size instead
+MAX_STREAM_ROWS = int(os.getenv("max_stream_rows", 100000))
+STREAM_BATCH_SIZE = int(os.getenv("stream_batch_size", 200))
+
+# Columns are aliased straight to the wire names of ArticleSummary/ArticleResponse,
+# so rows can be JSON-encoded as-is (see responses.FastJSONResponse).
+# Search result cards never need the LONGTEXT body, so the summary projection leaves it out.
+SUMMARY_COLUMNS = """
+    p.id, p.title, p.excerpt, p.cover_image_url AS image, p.created_at AS date,
+    u.full_name AS author, c.name AS category
+"""
+FULL_COLUMNS = SUMMARY_COLUMNS + ", p.content"
+# Single article: the full shape plus the bookkeeping columns the cache/ETag code needs
+ARTICLE_COLUMNS = FULL_COLUMNS + ", p.slug, p.updated_at"
+
+
+# Listing cards read the article_summaries read model (migrations.py): published rows
+# only, author and category names copied in, so a page is one index range scan with
+# no joins. view=full adds the body from posts by primary key.
+LISTING_COLUMNS = """
+    s.id, s.title, s.excerpt, s.cover_image_url AS image, s.created_at AS date,
+    s.author_name AS author, s.category_name AS category
+"""
+
+
+# Shared by every listing (and by the EXPLAIN check in migrations.py) so the
+# ORDER BY always lines up with the (created_at, id) index
+def listing_query(view, conditions):
+    columns, join = LISTING_COLUMNS, ""
+    if view != "summary":
+        columns, join = LISTING_COLUMNS + ", p.content", "JOIN posts p ON p.id = s.id"
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return text(f"""
+        SELECT {columns}
+        FROM article_summaries s
+        {join}
+        {where}
+        ORDER BY s.created_at DESC, s.id DESC
+        LIMIT :limit
+    """)
+
+
+# WHERE conditions + params shared by buffered pages, streamed pages and their boundary lookup
+def listing_conditions(cursor=None, category_id=None):
+    conditions = []
+    params = {}
+    if category_id is not None:
+        conditions.append("s.category_id = :category_id")
+        params["category_id"] = category_id
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        conditions.append("s.created_at <= :cursor_ts AND (s.created_at < :cursor_ts OR s.id < :cursor_id)")
+        params["cursor_ts"] = created_at
+        params["cursor_id"] = last_id
+    return conditions, params
+
+
+# Server-side (unbuffered) cursor on its own connection, yielding lists of at most
+# batch_size row mappings. A streamed response outlives the request's session, and
+# with stream_results the driver never holds more than one batch in memory.
+# engine: the one the request's session is bound to (a replica for routed reads).
+def stream_query(query, params=None, batch_size=STREAM_BATCH_SIZE, engine=None):
+    with (engine or get_engine()).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query, params or {})
+        yield from result.mappings().partitions()
+
+
+async def stream_query_async(query, params=None, batch_size=STREAM_BATCH_SIZE, engine=None):
+    async with (engine or get_async_engine()).connect() as conn:
+        result = await conn.stream(query, params or {})
+        async for rows in result.mappings().partitions(batch_size):
+            yield rows
+
+
+# Cursors are opaque to the client: base64 of "<created_at iso>|<id>" of the last row served
+def encode_cursor(created_at, article_id):
+    raw = f"{created_at.isoformat()}|{article_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, article_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.datetime.fromisoformat(created_at), int(article_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+MAX_SLUG_LENGTH = 240  # posts.slug is VARCHAR(255); leaves room for a "-<n>" suffix
+
+
+def slugify(value):
+    value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode()
+    value = re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-")
+    return value[:MAX_SLUG_LENGTH].rstrip("-") or "article"
+
+
+# Warm slug -> id map so hot slug URLs resolve without a query. Filled on lookup
+# and on create; update_article/delete_article keep this worker's copy current, and
+# the TTL bounds how long other workers keep resolving a renamed or deleted slug.
+class SlugIndex(TTLCache):
+    def discard_id(self, article_id):
+        self.delete_where(lambda slug, cached_id: cached_id == article_id)
+
+
+slug_index = SlugIndex(
+    "slugs",
+    maxsize=int(os.getenv("slug_index_size", 10000)),
+    ttl=float(os.getenv("article_cache_ttl", 60)),
+)
+
+
+# Read-through cache for article pages and single articles. Keys:
+#   ("article", id)                     -> row
+#   ("page", view, limit, cursor, category_id) -> (rows, next_cursor, ids on the page, etag)
+#   ("search", q, category, limit, offset) -> (rows, next_offset)
+# The write methods below invalidate exactly the entries they can affect.
+article_cache = TTLCache(
+    "articles",
+    maxsize=int(os.getenv("article_cache_size", 1024)),
+    ttl=float(os.getenv("article_cache_ttl", 60)),
+)
+
+
+def _is_page(key):
+    return key[0] == "page"
+
+
+# Any change to a published article can reorder relevance, so those writes drop every cached search
+def _is_search(key):
+    return key[0] == "search"
+
+
+# Bulk imports can land anywhere in the timeline (they may carry their own created_at)
+def invalidate_listings():
+    article_cache.delete_where(lambda key, value: key[0] in ("page", "search"))
+
+
+# A new published article is newer than every cursor, so only first pages (cursor=None) change
+def invalidate_first_pages():
+    article_cache.delete_where(lambda key, value: _is_search(key) or (_is_page(key) and key[3] is None))
+
+
+def invalidate_article(article_id, all_pages=False):
+    article_cache.delete(("article", article_id))
+    if all_pages:
+        article_cache.delete_where(lambda key, value: _is_page(key) or _is_search(key))
+    else:
+        article_cache.delete_where(lambda key, value: _is_search(key) or (_is_page(key) and article_id in value[2]))
+
+
+# --- CACHED READS ---
+# The read routes try these before opening a session, so a cache hit checks out no
+# pooled connection; on a miss they fall through to ArticleManager.fetch_page/fetch_search.
+def cached_page(limit, cursor, view, category_id):
+    cached = article_cache.get(("page", view, limit, cursor, category_id))
+    return None if cached is None else (cached[0], cached[1], cached[3])
+
+
+def cached_search(q, category, limit, offset):
+    return article_cache.get(("search", q, category, limit, offset))
+
+
+# Listing ETag: a hash of the page as served, stored with it in the cache entry, so a
+# tag always names exactly one body (and the X-Next-Cursor that goes with it)
+def page_etag(rows, next_cursor):
+    return make_etag(hashlib.sha1(dumps(rows)).hexdigest(), next_cursor)
+
+
+@metrics.instrument
 class ArticleManager:
     def __init__(self, db_session):
         self.db = db_session
 
     # --- INSIDE ArticleManager CLASS ---
 
-    def get_all_articles(self):
+    def get_all_articles(self, limit=DEFAULT_PAGE_SIZE, cursor=None, view="summary", category_id=None):
+        return cached_page(limit, cursor, view, category_id) or self.fetch_page(limit, cursor, view, category_id)
+
+    def fetch_page(self, limit, cursor=None, view="summary", category_id=None):
+        # Keyset pagination on (created_at, id): each page is an index range scan that
+        # starts where the previous one stopped, so the cost doesn't grow with the archive.
+        # Category feeds use the (category_id, created_at, id) index the same way.
+        conditions, params = listing_conditions(cursor, category_id)
+        params["limit"] = limit + 1  # One extra row tells us whether there is a next page
+
+        try:
+            result = self.db.execute(listing_query(view, conditions), params)
+            with profiling.span("fetch"):
+                rows = [dict(row) for row in result.mappings()]
+        except Exception as e:
+            self.db.rollback()  # <--- THIS WAS MISSING! RESET THE SESSION.
+            print(f"Read Error: {e}") # helpful for debugging
+            raise HTTPException(status_code=500, detail=f"Database Read Error: {str(e)}")
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["date"], rows[-1]["id"])
+        etag = page_etag(rows, next_cursor)
+        article_cache.set(("page", view, limit, cursor, category_id), (rows, next_cursor, frozenset(row["id"] for row in rows), etag))
+        return rows, next_cursor, etag
+
+    # --- STREAMED PAGES (?stream=true) ---
+    # For pages too large to buffer: returns (generator of JSON array chunks, next cursor).
+    # Rows go from the server-side cursor to the socket one batch at a time, never
+    # through the cache. The next cursor has to be known before the first byte is sent,
+    # so it comes from a covering-index lookup of the page's last row.
+    def stream_articles(self, limit, cursor=None, view="summary", category_id=None):
+        next_cursor = self.get_page_boundary(limit, cursor, category_id)
+        query, params = streamed_page_query(limit, cursor, view, category_id)
+        return stream_json_array(stream_query(query, params, engine=self.db.get_bind())), next_cursor
+
+    def get_page_boundary(self, limit, cursor=None, category_id=None):
+        conditions, params = listing_conditions(cursor, category_id)
         try:
-            query = text("""
-                SELECT p.*, u.full_name as author_name, c.name as category_name 
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = self.db.execute(text(f"""
+                SELECT s.created_at, s.id FROM article_summaries s
+                {where}
+                ORDER BY s.created_at DESC, s.id DESC
+                LIMIT 2 OFFSET :offset
+            """), {**params, "offset": limit - 1}).all()
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database Read Error: {str(e)}")
+        # Row 1 is the last one on this page; row 2 only proves there is a next page
+        return encode_cursor(*rows[0]) if len(rows) == 2 else None
+
+    # --- SEARCH ---
+    # Natural-language full-text match over title/excerpt/content, ranked by relevance
+    # (MySQL FULLTEXT or SQLite FTS5, see backends.py).
+    # Relevance order has no stable keyset, so pages use limit/offset (bounded by MAX_SEARCH_OFFSET).
+    def search_articles(self, q, category=None, limit=DEFAULT_PAGE_SIZE, offset=0):
+        return cached_search(q, category, limit, offset) or self.fetch_search(q, category, limit, offset)
+
+    def fetch_search(self, q, category=None, limit=DEFAULT_PAGE_SIZE, offset=0):
+        backend = get_backend()
+        join, match, score = backend.search_sql()
+        conditions = ["p.is_published = TRUE", match]
+        params = {"q": backend.search_terms(q), "limit": limit + 1, "offset": offset}
+        if category:
+            conditions.append("c.slug = :category")
+            params["category"] = category
+
+        try:
+            query = text(f"""
+                SELECT {SUMMARY_COLUMNS}, {score} AS score
                 FROM posts p
+                {join}
                 LEFT JOIN users u ON p.user_id = u.id
                 LEFT JOIN categories c ON p.category_id = c.id
-                WHERE p.is_published = TRUE
-                ORDER BY p.created_at DESC
+                WHERE {' AND '.join(conditions)}
+                ORDER BY score DESC, p.id DESC
+                LIMIT :limit OFFSET :offset
             """)
-            result = self.db.execute(query).mappings().all()
-            return result
+            result = self.db.execute(query, params)
+            with profiling.span("fetch"):
+                rows = [dict(row) for row in result.mappings()]
         except Exception as e:
-            self.db.rollback()  # <--- THIS WAS MISSING! RESET THE SESSION.
-            print(f"Read Error: {e}") # helpful for debugging
+            self.db.rollback()
+            print(f"Search Error: {e}")
             raise HTTPException(status_code=500, detail=f"Database Read Error: {str(e)}")
 
+        next_offset = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_offset = offset + limit
+        article_cache.set(("search", q, category, limit, offset), (rows, next_offset))
+        return rows, next_offset
+
+    # --- SLUGS ---
+    def get_article_id_by_slug(self, slug):
+        slug = slugify(slug)
+        article_id = slug_index.get(slug)
+        if article_id is not None:
+            return article_id
+        try:
+            article_id = self.db.execute(
+                text("SELECT id FROM posts WHERE slug = :slug"), {"slug": slug}
+            ).scalar_one_or_none()
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database Read Error: {str(e)}")
+        if article_id is None:
+            raise HTTPException(status_code=404, detail="Article not found")
+        slug_index.set(slug, article_id)
+        return article_id
+
+    # "my-title", then "my-title-2", "my-title-3", ... (a prefix range scan on the slug index)
+    # `reserved`: slugs already handed out but not yet inserted (bulk imports)
+    def _unique_slug(self, base, exclude_id=None, reserved=()):
+        rows = self.db.execute(
+            text("SELECT id, slug FROM posts WHERE slug = :base OR slug LIKE :pattern"),
+            {"base": base, "pattern": f"{base}-%"}
+        ).all()
+        taken = {row.slug for row in rows if row.id != exclude_id} | set(reserved)
+        if base not in taken:
+            return base
+        suffix = 2
+        while f"{base}-{suffix}" in taken:
+            suffix += 1
+        return f"{base}-{suffix}"
+
     def get_article_by_id(self, article_id):
+        cached = article_cache.get(("article", article_id))
+        if cached is not None:
+            return cached
+
         try:
-            query = text("""
-                SELECT p.*, u.full_name as author_name, c.name as category_name 
+            query = text(f"""
+                SELECT {ARTICLE_COLUMNS}
                 FROM posts p
                 LEFT JOIN users u ON p.user_id = u.id
                 LEFT JOIN categories c ON p.category_id = c.id
                 WHERE p.id = :id
             """)
-            article = self.db.execute(query, {"id": article_id}).mappings().fetchone()
+            result = self.db.execute(query, {"id": article_id})
+            with profiling.span("fetch"):
+                article = result.mappings().fetchone()
             
             if not article:
                 # 404 is not a DB error, so we don't need rollback, but good practice to close
                 raise HTTPException(status_code=404, detail="Article not found")
+            article_cache.set(("article", article_id), article)
             return article
             
         except HTTPException as he:
@@ -107,28 +476,167 @@ class ArticleManager:
         except Exception as e:
             self.db.rollback() # <--- THIS WAS MISSING!
             raise HTTPException(status_code=500, detail=str(e))
+
+    # --- SNAPSHOTS ---
+    # Pre-rendered bodies for the single-article route (see snapshots.py). Built by the
+    # write methods below; a read only comes here on a miss (cold process, evicted entry).
+    def get_article_snapshot(self, article_id):
+        snapshot = article_snapshots.get(article_id)
+        if snapshot is None:
+            snapshot = article_snapshots.put(article_id, self.get_article_by_id(article_id))
+        return snapshot
+
+    # Runs after the write has committed; if rendering fails the next read rebuilds it
+    def _refresh_snapshot(self, article_id):
+        try:
+            article_snapshots.put(article_id, self.get_article_by_id(article_id))
+        except Exception as e:
+            article_snapshots.discard(article_id)
+            print(f"Snapshot Error: {e}")
+
+    # categories.published_count is kept in the caller's transaction: -1 on the category
+    # a published article leaves, +1 on the one it joins (None = not counted anywhere)
+    def _move_published_count(self, from_category, to_category):
+        if from_category == to_category:
+            return False
+        query = text("UPDATE categories SET published_count = published_count + :delta WHERE id = :id")
+        if from_category:
+            self.db.execute(query, {"delta": -1, "id": from_category})
+        if to_category:
+            self.db.execute(query, {"delta": 1, "id": to_category})
+        return True
+
+    # article_summaries is kept in the same transaction: the row is re-derived from posts,
+    # which leaves none for an unpublished article
+    def _sync_summary(self, article_id):
+        self.db.execute(text("DELETE FROM article_summaries WHERE id = :id"), {"id": article_id})
+        self.db.execute(text(SUMMARY_INSERT.format(where="p.id = :id")), {"id": article_id})
+
     def create_article(self, data, user_id):
-        slug = data.title.lower().replace(" ", "-")
         query = text("""
             INSERT INTO posts (title, slug, excerpt, content, category_id, cover_image_url, is_published, user_id)
             VALUES (:title, :slug, :excerpt, :content, :cat_id, :img, :pub, :uid)
         """)
+        # Two attempts: a concurrent insert can claim the same suffix between the check and the INSERT
+        for attempt in range(2):
+            try:
+                slug = self._unique_slug(slugify(data.title))
+                result = self.db.execute(query, {
+                    "title": data.title,
+                    "slug": slug,
+                    "excerpt": data.excerpt,
+                    "content": data.content,
+                    "cat_id": data.category_id,
+                    "img": data.cover_image_url,
+                    "pub": data.is_published,
+                    "uid": user_id
+                })
+                counts_changed = self._move_published_count(None, data.category_id if data.is_published else None)
+                if data.is_published:
+                    self._sync_summary(result.lastrowid)
+                self.db.commit()
+                break
+            except IntegrityError as e:
+                self.db.rollback() # <--- ROLLBACK
+                if attempt or "slug" not in str(e.orig):
+                    raise HTTPException(status_code=500, detail=f"Error creating article: {str(e)}")
+            except Exception as e:
+                self.db.rollback() # <--- ROLLBACK
+                raise HTTPException(status_code=500, detail=f"Error creating article: {str(e)}")
+
+        slug_index.set(slug, result.lastrowid)
+        if data.is_published:
+            invalidate_first_pages()
+        if counts_changed:
+            invalidate_categories()
+        self._refresh_snapshot(result.lastrowid)
+        return {"message": "Article Created Successfully", "id": result.lastrowid, "slug": slug}
+
+    # --- BULK IMPORT / EXPORT ---
+    # One call = one chunk = one transaction: a multi-row INSERT (pymysql's executemany
+    # rewrites it into one statement as long as VALUES holds nothing but placeholders),
+    # plus the category count upkeep. If the chunk is rejected it is retried row by row,
+    # so a single bad row (e.g. an unknown category_id) is reported instead of sinking
+    # its neighbours. items: [(line number, ArticleImport)]. Returns (inserted, errors).
+    def import_articles(self, items, user_id):
         try:
-            self.db.execute(query, {
-                "title": data.title,
+            self._insert_imported(items, user_id)
+            self.db.commit()
+            return len(items), []
+        except (OperationalError, InterfaceError) as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=f"Error importing articles: {str(e)}")
+        except DBAPIError:
+            self.db.rollback()
+
+        inserted, errors = 0, []
+        for line, item in items:
+            try:
+                self._insert_imported([(line, item)], user_id)
+                self.db.commit()
+                inserted += 1
+            except (OperationalError, InterfaceError) as e:
+                self.db.rollback()
+                raise HTTPException(status_code=500, detail=f"Error importing articles: {str(e)}")
+            except DBAPIError as e:
+                self.db.rollback()
+                errors.append({"line": line, "error": str(e.orig)})
+        return inserted, errors
+
+    def _insert_imported(self, items, user_id):
+        # Slugs: one IN query for the whole chunk; only collisions pay for a suffix lookup
+        bases = [slugify(item.slug or item.title) for _, item in items]
+        taken = set(self.db.execute(
+            text("SELECT slug FROM posts WHERE slug IN :slugs").bindparams(bindparam("slugs", expanding=True)),
+            {"slugs": list(set(bases))}
+        ).scalars())
+        reserved = set()
+        rows = []
+        # The server's clock, as the column default would have used, for rows without a date
+        now = None
+        if any(item.created_at is None for _, item in items):
+            now = self.db.execute(text("SELECT CURRENT_TIMESTAMP")).scalar()
+        for base, (_, item) in zip(bases, items):
+            slug = base if base not in taken and base not in reserved else self._unique_slug(base, reserved=reserved)
+            reserved.add(slug)
+            rows.append({
+                "title": item.title,
                 "slug": slug,
-                "excerpt": data.excerpt,
-                "content": data.content,
-                "cat_id": data.category_id,
-                "img": data.cover_image_url,
-                "pub": data.is_published,
-                "uid": user_id
+                "excerpt": item.excerpt,
+                "content": item.content,
+                "cat_id": item.category_id,
+                "img": item.cover_image_url,
+                "pub": item.is_published,
+                "uid": user_id,
+                "created_at": item.created_at or now,
             })
-            self.db.commit()
-            return {"message": "Article Created Successfully"}
-        except Exception as e:
-            self.db.rollback() # <--- ROLLBACK
-            raise HTTPException(status_code=500, detail=f"Error creating article: {str(e)}")
+        self.db.execute(text("""
+            INSERT INTO posts (title, slug, excerpt, content, category_id, cover_image_url, is_published, user_id, created_at)
+            VALUES (:title, :slug, :excerpt, :content, :cat_id, :img, :pub, :uid, :created_at)
+        """), rows)
+        published_slugs = [row["slug"] for row in rows if row["pub"]]
+        if published_slugs:
+            self.db.execute(
+                text(SUMMARY_INSERT.format(where="p.slug IN :slugs")).bindparams(bindparam("slugs", expanding=True)),
+                {"slugs": published_slugs}
+            )
+
+        published = {}
+        for row in rows:
+            if row["pub"] and row["cat_id"]:
+                published[row["cat_id"]] = published.get(row["cat_id"], 0) + 1
+        if published:
+            self.db.execute(
+                text("UPDATE categories SET published_count = published_count + :delta WHERE id = :id"),
+                [{"id": category_id, "delta": delta} for category_id, delta in published.items()]
+            )
+
+    # NDJSON in the shape import_articles accepts. Streams from a server-side cursor on
+    # its own connection (the response outlives the request's session), so only one
+    # batch of rows is in memory at a time.
+    def export_articles(self):
+        for rows in stream_query(text(EXPORT_QUERY), batch_size=EXPORT_BATCH_SIZE):
+            yield b"".join(export_line(row) for row in rows)
 
     def update_article(self, id, data):
         try:
@@ -153,19 +661,52 @@ class ArticleManager:
             if data.category_id:
                 fields.append("category_id = :cat")
                 values["cat"] = data.category_id
+            # Slugs are permalinks, so a title change keeps the old one unless a new slug is sent
+            if data.slug:
+                values["slug"] = self._unique_slug(slugify(data.slug), exclude_id=id)
+                fields.append("slug = :slug")
                 
             if not fields: return {"message": "No changes detected"}
+
+            # Publishing, unpublishing or moving an article changes the category counts
+            before = None
+            if data.is_published is not None or data.category_id:
+                before = self.db.execute(
+                    text("SELECT category_id, is_published FROM posts WHERE id = :id" + get_backend().for_update), {"id": id}
+                ).fetchone()
             
             query = text(f"UPDATE posts SET {', '.join(fields)} WHERE id = :id")
             self.db.execute(query, values)
+            counts_changed = False
+            if before is not None:
+                published = before.is_published if data.is_published is None else data.is_published
+                counts_changed = self._move_published_count(
+                    before.category_id if before.is_published else None,
+                    (data.category_id or before.category_id) if published else None,
+                )
+            self._sync_summary(id)
             self.db.commit()
-            return {"message": "Article Updated"}
+            if "slug" in values:
+                slug_index.discard_id(id)
+                slug_index.set(values["slug"], id)
+            # Publishing (or moving to another category's feed) can drop the article into
+            # any page, so those clear every listing
+            invalidate_article(id, all_pages=bool(data.is_published or data.category_id))
+            if counts_changed:
+                invalidate_categories()
         except Exception as e:
             self.db.rollback() # <--- ROLLBACK
             raise HTTPException(status_code=500, detail=f"Error updating article: {str(e)}")
 
+        self._refresh_snapshot(id)
+        return {"message": "Article Updated"}
+
     def delete_article(self, id):
         try:
+            before = self.db.execute(
+                text("SELECT category_id, is_published FROM posts WHERE id = :id" + get_backend().for_update), {"id": id}
+            ).fetchone()
+            self.db.execute(text("DELETE FROM article_summaries WHERE id = :id"), {"id": id})
             query = text("DELETE FROM posts WHERE id = :id")
             result = self.db.execute(query, {"id": id})
             
@@ -173,7 +714,13 @@ class ArticleManager:
                 self.db.rollback() # Safety rollback
                 raise HTTPException(status_code=404, detail="Article not found")
 
+            counts_changed = self._move_published_count(before.category_id if before.is_published else None, None)
             self.db.commit()
+            slug_index.discard_id(id)
+            invalidate_article(id)
+            if counts_changed:
+                invalidate_categories()
+            article_snapshots.discard(id)
             return {"message": "Article Deleted"}
         except HTTPException as he:
             raise he
@@ -182,24 +729,99 @@ class ArticleManager:
             raise HTTPException(status_code=500, detail=f"Error deleting article: {str(e)}")
 
 
+def streamed_page_query(limit, cursor, view, category_id):
+    conditions, params = listing_conditions(cursor, category_id)
+    params["limit"] = limit
+    return listing_query(view, conditions), params
+
+
+EXPORT_QUERY = """
+    SELECT id, title, slug, excerpt, content, category_id, cover_image_url, is_published, created_at, updated_at
+    FROM posts
+    ORDER BY id
+"""
+
+
+def export_line(row):
+    row = dict(row)
+    row["is_published"] = bool(row["is_published"])
+    return dumps(row) + b"\n"
+
+
+# --- CATEGORY MANAGER ---
+# A handful of near-static rows: read once into memory and kept there until an article
+# write changes a count (or the TTL passes, which bounds staleness across workers).
+# Counts come from categories.published_count, never from COUNT(*) over posts.
+category_cache = TTLCache("categories", maxsize=1, ttl=float(os.getenv("category_cache_ttl", 300)))
+
+
+def invalidate_categories():
+    category_cache.clear()
+
+
+# Like cached_page: lets the category routes skip the session on a hit
+def cached_categories():
+    return category_cache.get("all")
+
+
+def find_category(categories, slug):
+    for category in categories:
+        if category["slug"] == slug:
+            return category
+    raise HTTPException(status_code=404, detail="Category not found")
+
+
+@metrics.instrument
+class CategoryManager:
+    def __init__(self, db_session):
+        self.db = db_session
+
+    def get_categories(self):
+        return cached_categories() or self.fetch_categories()
+
+    def fetch_categories(self):
+        try:
+            rows = self.db.execute(text(
+                "SELECT id, name, slug, published_count AS count FROM categories ORDER BY id"
+            )).mappings()
+            categories = [dict(row) for row in rows]
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database Read Error: {str(e)}")
+        category_cache.set("all", categories)
+        return categories
+
+    def get_category(self, slug):
+        return find_category(self.get_categories(), slug)
+
+
 # --- CONTACT MANAGER ---
+CONTACT_INSERT = """
+    INSERT INTO contacts (first_name, last_name, email, subject, message)
+    VALUES (:fn, :ln, :email, :sub, :msg)
+"""
+
+@metrics.instrument
 class ContactManager:
     def __init__(self, db_session):
         self.db = db_session
 
     def submit_message(self, data):
-        query = text("""
-            INSERT INTO contacts (first_name, last_name, email, subject, message)
-            VALUES (:fn, :ln, :email, :sub, :msg)
-        """)
+        row = {
+            "fn": data.firstName,
+            "ln": data.lastName,
+            "email": data.email,
+            "sub": data.subject,
+            "msg": data.message
+        }
+        # Write-behind mode: spool + batch insert in the background (see writer.py)
+        writer = writers.get("contacts")
+        if writer:
+            writer.submit(row)
+            return {"message": "Message received successfully"}
+
         try:
-            self.db.execute(query, {
-                "fn": data.firstName,
-                "ln": data.lastName,
-                "email": data.email,
-                "sub": data.subject,
-                "msg": data.message
-            })
+            self.db.execute(text(CONTACT_INSERT), row)
             self.db.commit()
             return {"message": "Message received successfully"}
         except Exception as e:
@@ -208,16 +830,113 @@ class ContactManager:
 
 
 # --- NEWSLETTER MANAGER ---
+# Run through get_backend().insert_ignore(): re-subscribing an address is a no-op
+SUBSCRIBER_INSERT = "INSERT INTO subscribers (email) VALUES (:email)"
+
+@metrics.instrument
 class NewsletterManager:
     def __init__(self, db_session):
         self.db = db_session
 
     def subscribe(self, email):
-        query = text("INSERT IGNORE INTO subscribers (email) VALUES (:email)")
+        writer = writers.get("subscribers")
+        if writer:
+            writer.submit({"email": email})
+            return {"message": "Subscribed successfully"}
+
         try:
-            self.db.execute(query, {"email": email})
+            self.db.execute(text(get_backend().insert_ignore(SUBSCRIBER_INSERT)), {"email": email})
             self.db.commit()
             return {"message": "Subscribed successfully"}
         except Exception as e:
             self.db.rollback() # <--- ROLLBACK
-            raise HTTPException(status_code=500, detail=f"Error subscribing: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Error subscribing: {str(e)}")
+
+
+# --- ASYNC MANAGERS (db_mode=async) ---
+# Same SQL, caching and invalidation as the managers above, driven through
+# AsyncSession.run_sync: SQLAlchemy runs the sync code in a greenlet on top of the
+# aiomysql driver, so each DB wait yields to the event loop instead of holding a
+# threadpool worker.
+class AsyncManager:
+    manager_class = None
+
+    def __init__(self, db_session):
+        self.db = db_session
+
+    async def _run(self, method, *args):
+        return await self.db.run_sync(lambda session: getattr(self.manager_class(session), method)(*args))
+
+
+class AsyncArticleManager(AsyncManager):
+    manager_class = ArticleManager
+
+    async def get_all_articles(self, limit=DEFAULT_PAGE_SIZE, cursor=None, view="summary", category_id=None):
+        return await self._run("get_all_articles", limit, cursor, view, category_id)
+
+    async def search_articles(self, q, category=None, limit=DEFAULT_PAGE_SIZE, offset=0):
+        return await self._run("search_articles", q, category, limit, offset)
+
+    async def fetch_page(self, limit, cursor=None, view="summary", category_id=None):
+        return await self._run("fetch_page", limit, cursor, view, category_id)
+
+    async def fetch_search(self, q, category=None, limit=DEFAULT_PAGE_SIZE, offset=0):
+        return await self._run("fetch_search", q, category, limit, offset)
+
+    async def get_article_id_by_slug(self, slug):
+        return await self._run("get_article_id_by_slug", slug)
+
+    async def get_article_by_id(self, article_id):
+        return await self._run("get_article_by_id", article_id)
+
+    async def get_article_snapshot(self, article_id):
+        return await self._run("get_article_snapshot", article_id)
+
+    async def create_article(self, data, user_id):
+        return await self._run("create_article", data, user_id)
+
+    async def update_article(self, id, data):
+        return await self._run("update_article", id, data)
+
+    async def delete_article(self, id):
+        return await self._run("delete_article", id)
+
+    async def import_articles(self, items, user_id):
+        return await self._run("import_articles", items, user_id)
+
+    # Async generator over the aiomysql server-side cursor
+    async def export_articles(self):
+        async for rows in stream_query_async(text(EXPORT_QUERY), batch_size=EXPORT_BATCH_SIZE):
+            yield b"".join(export_line(row) for row in rows)
+
+    async def stream_articles(self, limit, cursor=None, view="summary", category_id=None):
+        next_cursor = await self._run("get_page_boundary", limit, cursor, category_id)
+        query, params = streamed_page_query(limit, cursor, view, category_id)
+        return stream_json_array_async(stream_query_async(query, params, engine=self.db.bind)), next_cursor
+
+
+class AsyncCategoryManager(AsyncManager):
+    manager_class = CategoryManager
+
+    async def get_categories(self):
+        return await self._run("get_categories")
+
+    async def fetch_categories(self):
+        return await self._run("fetch_categories")
+
+    async def get_category(self, slug):
+        return await self._run("get_category", slug)
+
+
+class AsyncContactManager(AsyncManager):
+    manager_class = ContactManager
+
+    async def submit_message(self, data):
+        return await self._run("submit_message", data)
+
+
+class AsyncNewsletterManager(AsyncManager):
+    manager_class = NewsletterManager
+
+    async def subscribe(self, email):
+        return await self._run("subscribe", email)
@@ -0,0 +1,138 @@
+# backend/snapshots.py
+# Pre-rendered article bodies for GET /api/articles/{id}.
+#
+# The ArticleManager write methods render each article once, as the exact
+# ArticleResponse JSON plus gzip and (when the brotli package is installed) brotli
+# variants, and store that immutable snapshot. Reads pick the variant the client
+# accepts and send the bytes as-is: no query, no validation, no encoding.
+#
+# Snapshots live in a bounded in-process cache. With snapshot_dir set they are also
+# written to one file per article and served from a memory map, which keeps them
+# out of the Python heap and shares them between workers on the same host (a
+# rewrite is an atomic rename, picked up on the next read via the file's inode).
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from datetime import datetime
+
+import profiling
+from cache import TTLCache
+from http_cache import AVAILABLE_ENCODINGS, compress
+from schemas import ArticleResponse
+
+SNAPSHOT_DIR = os.getenv("snapshot_dir")
+GZIP_LEVEL = int(os.getenv("snapshot_gzip_level", 9))  # Paid once per write, so use the best ratio
+BROTLI_QUALITY = int(os.getenv("snapshot_brotli_quality", 11))
+
+
+class Snapshot:
+    def __init__(self, etag, last_modified, bodies, inode=None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.bodies = bodies  # encoding -> bytes or memoryview ("identity", "gzip", "br")
+        self.inode = inode
+
+
+def render(row):
+    with profiling.span("validate"):
+        article = ArticleResponse.model_validate(dict(row))
+    with profiling.span("serialize"):
+        body = article.model_dump_json().encode()
+    bodies = {"identity": body}
+    with profiling.span("compress"):
+        for encoding in AVAILABLE_ENCODINGS:
+            bodies[encoding] = compress(body, encoding, BROTLI_QUALITY if encoding == "br" else GZIP_LEVEL)
+    etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+    return Snapshot(etag, row["updated_at"], bodies)
+
+
+# File layout: one JSON header line (etag, last_modified, encoding -> [offset, length])
+# followed by the bodies back to back.
+def _write_file(path, snapshot):
+    parts, offset = {}, 0
+    for encoding, body in snapshot.bodies.items():
+        parts[encoding] = [offset, len(body)]
+        offset += len(body)
+    header = {
+        "etag": snapshot.etag,
+        "last_modified": snapshot.last_modified.isoformat() if snapshot.last_modified else None,
+        "parts": parts,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            for body in snapshot.bodies.values():
+                f.write(body)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _map_file(path):
+    with open(path, "rb") as f:
+        inode = os.fstat(f.fileno()).st_ino
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    start = mapped.find(b"\n") + 1
+    header = json.loads(bytes(view[:start]))
+    bodies = {
+        encoding: view[start + offset:start + offset + length]
+        for encoding, (offset, length) in header["parts"].items()
+    }
+    last_modified = datetime.fromisoformat(header["last_modified"]) if header["last_modified"] else None
+    return Snapshot(header["etag"], last_modified, bodies, inode)
+
+
+class SnapshotStore:
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.cache = TTLCache(
+            "snapshots",
+            maxsize=int(os.getenv("snapshot_cache_size", 1024)),
+            # Bounds staleness across workers in memory-only mode, and how long a miss
+            # rebuilt from a lagging replica is served; same default as the article cache
+            ttl=float(os.getenv("snapshot_ttl", os.getenv("article_cache_ttl", 60))),
+        )
+
+    def _path(self, article_id):
+        return os.path.join(self.directory, f"{article_id}.snap")
+
+    def get(self, article_id):
+        snapshot = self.cache.get(article_id)
+        if not self.directory:
+            return snapshot
+        try:
+            inode = os.stat(self._path(article_id)).st_ino
+            if snapshot is None or snapshot.inode != inode:
+                snapshot = _map_file(self._path(article_id))
+                self.cache.set(article_id, snapshot)
+        except FileNotFoundError:
+            self.cache.delete(article_id)  # Deleted by another worker
+            return None
+        return snapshot
+
+    def put(self, article_id, row):
+        snapshot = render(row)
+        if self.directory:
+            path = self._path(article_id)
+            _write_file(path, snapshot)
+            snapshot = _map_file(path)
+        self.cache.set(article_id, snapshot)
+        return snapshot
+
+    def discard(self, article_id):
+        self.cache.delete(article_id)
+        if self.directory:
+            try:
+                os.unlink(self._path(article_id))
+            except FileNotFoundError:
+                pass
+
+
+article_snapshots = SnapshotStore()
@@ -1,8 +1,14 @@
 #!/bin/bash
 
-# 1. Initialize Database (Safe to run every time)
-echo "🌱 Seeding Database..."
-python seed.py
+# 1. Migrate + seed only when asked (e.g. a release/pre-deploy step sets RUN_MIGRATIONS=1).
+#    Regular (auto-scaled) starts skip this so they can serve immediately.
+if [ "${RUN_MIGRATIONS:-0}" = "1" ]; then
+    echo "🛠️ Migrating Database..."
+    python manage.py migrate || exit 1
+
+    echo "🌱 Seeding Database..."
+    python manage.py seed || exit 1
+fi
 
 # 2. Start the Server
 # Uses the PORT environment variable if available, otherwise defaults to 8000
@@ -0,0 +1,158 @@
+# backend/view_counter.py
+# Article view counts and the "popular articles" list.
+#
+# record() is all GET /api/articles/{id} pays: one dict increment in the calling
+# thread's own shard (same scheme as metrics.py, no lock, no DB). Shards only ever
+# grow; a background thread sums them every view_flush_interval seconds, subtracts
+# what it already wrote, and adds the difference to posts.views in one batched UPDATE.
+# Views not yet flushed when a worker dies are lost, which is acceptable for a counter.
+#
+# After each flush the same thread reloads the top popular_size articles by posts.views
+# (every worker's flushed views, via the (is_published, views) index), so
+# GET /api/articles/popular is answered from memory and is at most one interval stale.
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+import metrics
+from database import get_engine
+from services import LISTING_COLUMNS
+
+FLUSH_INTERVAL = float(os.getenv("view_flush_interval", 10))
+POPULAR_SIZE = int(os.getenv("popular_size", 10))
+FLUSH_CHUNK = 500  # Ids per UPDATE statement
+
+POPULAR_QUERY = text(f"""
+    SELECT {LISTING_COLUMNS}, p.views
+    FROM posts p
+    JOIN article_summaries s ON s.id = p.id
+    WHERE p.is_published = TRUE
+    ORDER BY p.views DESC, p.id DESC
+    LIMIT :limit
+""")
+
+
+# views = views + CASE id WHEN ... END for a whole batch. updated_at is assigned to itself
+# so MySQL's ON UPDATE doesn't fire: a view is not an edit (article ETags and replica
+# lag checks read updated_at). SQLite's trigger ignores this column (migration 8).
+def flush_statement(size):
+    cases = " ".join(f"WHEN :id{i} THEN :n{i}" for i in range(size))
+    ids = ", ".join(f":id{i}" for i in range(size))
+    return text(f"""
+        UPDATE posts SET views = views + CASE id {cases} END, updated_at = updated_at
+        WHERE id IN ({ids})
+    """)
+
+
+class ViewCounter:
+    def __init__(self, flush_interval=FLUSH_INTERVAL, popular_size=POPULAR_SIZE):
+        self.flush_interval = flush_interval
+        self.popular_size = popular_size
+        self.popular = []  # Wire-shaped rows, most viewed first; replaced whole, never mutated
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+        self._flushed = {}  # article id -> views already written; only changed under _flush_lock
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def record(self, article_id):
+        shard = self._shard()
+        shard[article_id] = shard.get(article_id, 0) + 1
+
+    # dict() copies are atomic under the GIL, so owners keep counting while we read
+    def _totals(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for article_id, count in dict(shard).items():
+                totals[article_id] = totals.get(article_id, 0) + count
+        return totals
+
+    # --- FLUSH ---
+    def flush(self):
+        with self._flush_lock:
+            totals = self._totals()
+            # Sorted, so concurrent flushes from several workers lock rows in the same order
+            deltas = sorted(
+                (article_id, total - self._flushed.get(article_id, 0))
+                for article_id, total in totals.items() if total > self._flushed.get(article_id, 0)
+            )
+            if not deltas:
+                return 0
+            started = time.perf_counter()
+            try:
+                with metrics.operation("ViewCounter.flush"), get_engine().begin() as conn:
+                    for start in range(0, len(deltas), FLUSH_CHUNK):
+                        chunk = deltas[start:start + FLUSH_CHUNK]
+                        params = {}
+                        for i, (article_id, delta) in enumerate(chunk):
+                            params[f"id{i}"] = article_id
+                            params[f"n{i}"] = delta
+                        conn.execute(flush_statement(len(chunk)), params)
+            except Exception as e:
+                # Nothing is marked as written, so the same deltas go out with the next flush
+                metrics.incr("views.flush_failures")
+                print(f"View count flush failed ({len(deltas)} articles), will retry: {e}")
+                return 0
+            for article_id, delta in deltas:
+                self._flushed[article_id] = self._flushed.get(article_id, 0) + delta
+            flushed = sum(delta for _, delta in deltas)
+            metrics.observe("views.flush", time.perf_counter() - started)
+            metrics.incr("views.flushed", flushed)
+            return flushed
+
+    def refresh_popular(self):
+        try:
+            with metrics.operation("ViewCounter.refresh_popular"), get_engine().connect() as conn:
+                rows = [dict(row) for row in conn.execute(POPULAR_QUERY, {"limit": self.popular_size}).mappings()]
+        except Exception as e:
+            print(f"Popular articles refresh failed, keeping the previous list: {e}")
+            return
+        self.popular = rows
+
+    def _loop(self):
+        # First load right away, but here rather than in start(): the lifespan runs on the
+        # event loop, and startup makes no DB round trips. Until it lands the list is empty.
+        self.refresh_popular()
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            self.refresh_popular()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="view-counter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()  # Final flush on shutdown
+
+    def stats(self):
+        flushed = dict(self._flushed)
+        pending = {article_id: total - flushed.get(article_id, 0) for article_id, total in self._totals().items()}
+        return {
+            "pending_articles": sum(1 for delta in pending.values() if delta),
+            "pending_views": sum(pending.values()),
+        }
+
+
+view_counter = ViewCounter()
+metrics.register_gauge("views", view_counter.stats)
@@ -0,0 +1,217 @@
+# backend/writer.py
+# Write-behind batching for fire-and-forget inserts (contact form, newsletter).
+#
+# submit() appends the row to a local spool file and to an in-memory buffer and
+# returns immediately. A background thread flushes the buffer as one multi-row
+# INSERT when it reaches batch_size rows or every flush_interval seconds, whichever
+# comes first. Each flush seals the current spool file and only deletes it after
+# the INSERT commits, so rows accepted before a crash are replayed on the next start.
+#
+# Every spool file is held under an exclusive flock by the process that owns it;
+# at startup a writer adopts any file it can lock, i.e. files left by dead processes.
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+import metrics
+from database import get_engine
+
+ENABLED = os.getenv("write_behind", "false").lower() == "true"
+SPOOL_DIR = os.getenv("write_behind_spool_dir", os.path.join(os.path.dirname(os.path.abspath(__file__)), "spool"))
+BATCH_SIZE = int(os.getenv("write_behind_batch_size", 500))
+FLUSH_INTERVAL = float(os.getenv("write_behind_flush_interval", 1.0))
+FSYNC = os.getenv("write_behind_fsync", "false").lower() == "true"
+
+# name -> running BatchWriter; empty unless write-behind is enabled in the app lifespan
+writers = {}
+
+
+def spool_line(row):
+    return json.dumps(row, default=str) + "\n"
+
+
+class SpoolFile:
+    def __init__(self, path, rows=None):
+        self.path = path
+        self.file = open(path, "a+", encoding="utf-8")
+        fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)  # Raises if another process owns it
+        self.rows = rows
+
+    def load(self):
+        if self.rows is None:
+            self.file.seek(0)
+            self.rows = []
+            for line in self.file:
+                try:
+                    self.rows.append(json.loads(line))
+                except ValueError:
+                    pass  # Torn last line from a crash mid-write
+        return self.rows
+
+    # Replaces the file's contents with the rows still to be written
+    def rewrite(self, rows):
+        self.rows = rows
+        self.file.seek(0)
+        self.file.truncate()
+        self.file.write("".join(spool_line(row) for row in rows))
+        self.file.flush()
+        if FSYNC:
+            os.fsync(self.file.fileno())
+
+    def remove(self):
+        os.unlink(self.path)  # Unlink while still locked so nobody can adopt it in between
+        self.file.close()
+
+
+class BatchWriter:
+    def __init__(self, name, statement, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, spool_dir=SPOOL_DIR):
+        self.name = name
+        self.statement = text(statement)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_dir = spool_dir
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._buffer = []
+        self._sealed = []   # SpoolFiles waiting to be written (or retried)
+        self._seq = 0
+        self._spool = None
+        self._running = False
+        self._thread = None
+        metrics.register_gauge(f"writer.{name}", self.stats)
+
+    def _new_spool(self, rows=None):
+        self._seq += 1
+        path = os.path.join(self.spool_dir, f"{self.name}-{os.getpid()}-{self._seq}.spool")
+        return SpoolFile(path, rows)
+
+    def start(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, f"{self.name}-*.spool"))):
+            try:
+                orphan = SpoolFile(path)
+            except OSError:
+                continue  # Locked: belongs to a live worker
+            if orphan.load():
+                print(f"Replaying {len(orphan.rows)} spooled {self.name} row(s) from {path}")
+                self._sealed.append(orphan)
+            else:
+                orphan.remove()
+        self._spool = self._new_spool(rows=[])
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"writer-{self.name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        line = spool_line(row)
+        with self._cond:
+            self._spool.file.write(line)
+            self._spool.file.flush()
+            if FSYNC:
+                os.fsync(self._spool.file.fileno())
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                running = self._running
+            self.flush()
+            if not running:
+                return
+
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                if self._buffer:
+                    # Seal the current spool: it holds exactly the rows in the buffer
+                    self._spool.rows = self._buffer
+                    self._sealed.append(self._spool)
+                    self._buffer = []
+                    self._spool = self._new_spool(rows=[])
+                batches = list(self._sealed)
+
+            for batch in batches:
+                rows = batch.load()
+                started = time.perf_counter()
+                try:
+                    try:
+                        self._insert(rows)
+                    except (OperationalError, InterfaceError):
+                        raise
+                    except DBAPIError:
+                        # A bad row fails the whole statement; insert one by one so it can't block the queue
+                        self._insert_rows_individually(batch)
+                except Exception as e:
+                    # Connection-level problem: keep the batch spooled and retry on the next flush
+                    metrics.incr(f"writer.{self.name}.failures")
+                    print(f"Write-behind flush failed for {self.name} ({len(rows)} rows), will retry: {e}")
+                    return
+                metrics.observe(f"writer.{self.name}.flush", time.perf_counter() - started)
+                metrics.incr(f"writer.{self.name}.rows", len(rows))
+                with self._cond:
+                    self._sealed.remove(batch)
+                batch.remove()
+
+    def _insert(self, rows):
+        # pymysql's executemany rewrites INSERT ... VALUES into one multi-row statement
+        with metrics.operation(f"BatchWriter.{self.name}"), get_engine().begin() as conn:
+            conn.execute(self.statement, rows)
+
+    # Each row commits on its own, so if the connection fails part way the spool is cut
+    # down to the rows not yet handled: the retry doesn't insert the committed ones again
+    def _insert_rows_individually(self, batch):
+        done = 0
+        try:
+            for row in batch.rows:
+                try:
+                    self._insert([row])
+                except (OperationalError, InterfaceError):
+                    raise
+                except DBAPIError as e:
+                    metrics.incr(f"writer.{self.name}.rejected")
+                    print(f"Write-behind dropped a {self.name} row: {e}")
+                done += 1
+        except Exception:
+            if done:
+                metrics.incr(f"writer.{self.name}.rows", done)
+                batch.rewrite(batch.rows[done:])
+            raise
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+        self.flush()  # Final flush; anything that still fails stays spooled for the next start
+        if not self._buffer:
+            self._spool.remove()
+
+    def stats(self):
+        return {
+            "queue_depth": len(self._buffer) + sum(len(batch.rows or []) for batch in self._sealed),
+            "sealed_batches": len(self._sealed),
+        }
+
+
+def start_writers(statements):
+    for name, statement in statements.items():
+        writer = BatchWriter(name, statement)
+        writer.start()
+        writers[name] = writer
+
+
+def stop_writers():
+    for writer in writers.values():
+        writer.stop()
+    writers.clear()